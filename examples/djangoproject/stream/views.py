@@ -5,7 +5,7 @@ from dataclasses import dataclass
 
 from django.http import HttpRequest, StreamingHttpResponse
 
-from htpy import Element, body, h1, head, html, link, table, td, th, title, tr
+from htpy import Element, body, h1, head, html, link, prefetch, table, td, th, title, tr
 
 
 @dataclass
@@ -45,4 +45,5 @@ def streaming_table_page(items: Iterable[Item]) -> Element:
 
 
 def stream(request: HttpRequest) -> StreamingHttpResponse:
-    return StreamingHttpResponse(streaming_table_page(generate_items()))
+    # Fetch the next items in the background while the previous ones are rendered.
+    return StreamingHttpResponse(streaming_table_page(prefetch(generate_items())))
@@ -3,23 +3,118 @@ from __future__ import annotations
 __version__ = "24.9.1"
 __all__: list[str] = []
 
+import codecs
+import contextvars
 import dataclasses
 import functools
+import inspect
+import io
+import json
+import operator
+import os
+import re
+import secrets
+import sys
+import threading
 import typing as t
-from collections.abc import Callable, Generator, Iterable, Iterator
+import zlib
+from collections import OrderedDict
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Collection,
+    Generator,
+    Iterable,
+    Iterator,
+)
+from time import monotonic as _monotonic
 
 from markupsafe import Markup as _Markup
 from markupsafe import escape as _escape
 
 if t.TYPE_CHECKING:
+    import asyncio
+    import concurrent.futures
     from types import UnionType
 
 BaseElementSelf = t.TypeVar("BaseElementSelf", bound="BaseElement")
 ElementSelf = t.TypeVar("ElementSelf", bound="Element")
 
 
+def _escape_str(value: str) -> str:
+    # Most text does not contain anything that needs escaping. Checking for it
+    # is a lot cheaper than escaping and lets the text be used as is.
+    if "&" in value or "<" in value or ">" in value or '"' in value or "'" in value:
+        return str(_escape(value))
+    return value
+
+
+# Only strings up to this length are memoized when escaping.
+_ESCAPE_MEMO_MAX_LENGTH = 64
+
+
+def _text_escaper(escape: Callable[[str], str], memo_size: int) -> Callable[[str], str]:
+    # Pages often repeat the same short texts (labels, statuses, currency
+    # codes...). Remember how they were escaped. The memo is cleared when it is
+    # full to keep it bounded.
+    memo: dict[str, str] = {}
+    memo_get = memo.get
+
+    def escape_text(value: str) -> str:
+        if type(value) is not str:
+            value = str(value)
+
+        escaped = memo_get(value)
+        if escaped is None:
+            escaped = escape(value)
+            if type(escaped) is not str:
+                # Like markupsafe.escape(), which returns Markup.
+                escaped = str(escaped)
+            if memo_size and len(value) <= _ESCAPE_MEMO_MAX_LENGTH:
+                if len(memo) >= memo_size:
+                    memo.clear()
+                memo[value] = escaped
+
+        return escaped
+
+    return escape_text
+
+
+_escape_text = _text_escaper(_escape_str, 1024)
+
+
+def set_escaper(escape: Callable[[str], str] | None = None, *, memo_size: int = 1024) -> None:
+    """Replace the function used to escape text children and attributes.
+
+    escape is called with a str and must return it with at least &, <, >, " and
+    ' escaped. Results for short strings are memoized, up to memo_size strings.
+    Call without escape to restore the default escaping.
+
+    Call it before any elements are built or rendered. The attribute cache is
+    cleared, but elements that already exist keep their attribute strings and
+    the HTML cached for static elements, and static() and compiled components
+    keep the HTML they have rendered.
+    """
+    global _escape_text, _cached_call_attrs_string
+
+    if memo_size < 0:
+        raise ValueError("memo_size must not be negative")
+
+    _escape_text = _text_escaper(escape or _escape_str, memo_size)
+    _cached_call_attrs_string = functools.lru_cache(maxsize=_attribute_cache_size)(
+        _call_attrs_string_from_items
+    )
+
+
 def _force_escape(value: t.Any) -> str:
-    return _escape(str(value))
+    if type(value) is int:
+        return str(value)
+    if type(value) is _Placeholder:
+        # An attribute value of a compiled component, see _trace.
+        return value._text_marker  # pyright: ignore [reportPrivateUsage]
+    return _escape_text(str(value))
 
 
 # Inspired by https://www.npmjs.com/package/classnames
@@ -98,7 +193,13 @@ def _generate_attrs(raw_attrs: dict[str, Attribute]) -> Iterable[tuple[str, Attr
             yield _force_escape(key), True
 
         else:
-            if not isinstance(value, str | int | _HasHtml):
+            kind = _node_kinds[type(value)]
+            if (
+                kind is not _TEXT
+                and kind is not _HTML
+                and kind is not _INT
+                and not isinstance(value, str | int | _HasHtml)
+            ):
                 raise ValueError(f"Attribute value must be a string or an integer , got {value!r}")
 
             yield _force_escape(key), _force_escape(value)
@@ -113,6 +214,80 @@ def _attrs_string(attrs: dict[str, Attribute]) -> str:
     return " " + result
 
 
+def _uncached_call_attrs_string(
+    id_class: str, attrs: dict[str, Attribute], kwargs: dict[str, Attribute]
+) -> str:
+    return _attrs_string(
+        {
+            **(_id_class_names_from_css_str(id_class) if id_class else {}),
+            **attrs,
+            **{_kwarg_attribute_name(k): v for k, v in kwargs.items()},
+        }
+    )
+
+
+def _call_attrs_string_from_items(
+    id_class: str,
+    attrs_items: tuple[tuple[str, Attribute], ...],
+    kwargs_items: tuple[tuple[str, Attribute], ...],
+    value_types: tuple[type, ...],
+) -> str:
+    # value_types is only part of the cache key: 1, 1.0 and True (and "a" and
+    # Markup("a")) are equal and hash the same but are rendered differently.
+    return _uncached_call_attrs_string(id_class, dict(attrs_items), dict(kwargs_items))
+
+
+# Values of these types are hashable and equal values of the same type always
+# render the same. Attributes with other values (class lists/dicts, __html__
+# objects, ...) are never cached.
+_CACHEABLE_ATTRIBUTE_TYPES = frozenset({str, int, bool, type(None), _Markup})
+
+_attribute_cache_size = 2048
+_cached_call_attrs_string = functools.lru_cache(maxsize=_attribute_cache_size)(
+    _call_attrs_string_from_items
+)
+
+
+def _call_attrs_string(
+    id_class: str, attrs: dict[str, Attribute], kwargs: dict[str, Attribute]
+) -> str:
+    if _attribute_cache_size and type(id_class) is str and type(attrs) is dict:
+        value_types = tuple([type(v) for v in (*attrs.values(), *kwargs.values())])
+        if _CACHEABLE_ATTRIBUTE_TYPES.issuperset(value_types):
+            return _cached_call_attrs_string(
+                id_class, tuple(attrs.items()), tuple(kwargs.items()), value_types
+            )
+
+    return _uncached_call_attrs_string(id_class, attrs, kwargs)
+
+
+class CacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def set_attribute_cache_size(maxsize: int) -> None:
+    """Set how many attribute strings are cached. 0 disables the cache.
+
+    Changing the size clears the cache.
+    """
+    global _attribute_cache_size, _cached_call_attrs_string
+
+    if maxsize < 0:
+        raise ValueError("maxsize must not be negative")
+
+    _attribute_cache_size = maxsize
+    _cached_call_attrs_string = functools.lru_cache(maxsize=maxsize)(_call_attrs_string_from_items)
+
+
+def attribute_cache_info() -> CacheInfo:
+    """Return hit/miss statistics for the attribute cache."""
+    hits, misses, _, currsize = _cached_call_attrs_string.cache_info()
+    return CacheInfo(hits, misses, _attribute_cache_size, currsize)
+
+
 T = t.TypeVar("T")
 P = t.ParamSpec("P")
 
@@ -129,6 +304,25 @@ class ContextProvider(t.Generic[T]):
     def __str__(self) -> str:
         return render_node(self)
 
+    def _provide(self, parent: _ProvidedContext | None) -> _ProvidedContext:
+        return _ProvidedContext(self.context, self.value, parent)
+
+
+@dataclasses.dataclass(frozen=True)
+class LazyContextProvider(t.Generic[T]):
+    context: Context[T]
+    factory: Callable[[], T]
+    func: Callable[[], Node]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> str:
+        return render_node(self)
+
+    def _provide(self, parent: _ProvidedContext | None) -> _ProvidedContext:
+        return _ProvidedContext(self.context, _LazyContextValue(self.factory), parent)
+
 
 @dataclasses.dataclass(frozen=True)
 class ContextConsumer(t.Generic[T]):
@@ -141,6 +335,55 @@ class _NO_DEFAULT:
     pass
 
 
+class _NOT_COMPUTED:
+    pass
+
+
+class _LazyContextValue:
+    """A value of Context.lazy_provider() that is computed on first use.
+
+    Workers of iter_node(executor=...) and deferred() share the provided
+    context, so the value is computed under a lock to call factory at most
+    once per render.
+    """
+
+    __slots__ = ("factory", "value", "lock")
+
+    def __init__(self, factory: Callable[[], t.Any]) -> None:
+        self.factory = factory
+        self.value: t.Any = _NOT_COMPUTED
+        # Reentrant, so that a factory that consumes its own context fails
+        # with RecursionError rather than a deadlock.
+        self.lock = threading.RLock()
+
+    def get(self) -> t.Any:
+        value = self.value
+        if value is _NOT_COMPUTED:
+            with self.lock:
+                value = self.value
+                if value is _NOT_COMPUTED:
+                    value = self.value = self.factory()
+        return value
+
+
+class _ProvidedContext:
+    """A context value provided by a ContextProvider.
+
+    Providers nested inside each other form a linked list from the innermost to
+    the outermost provider. Providing a value is O(1) and looking up a value
+    walks the (usually very short) list of active providers.
+    """
+
+    __slots__ = ("context", "value", "parent")
+
+    def __init__(
+        self, context: Context[t.Any], value: t.Any, parent: _ProvidedContext | None
+    ) -> None:
+        self.context = context
+        self.value = value
+        self.parent = parent
+
+
 class Context(t.Generic[T]):
     def __init__(self, name: str, *, default: T | type[_NO_DEFAULT] = _NO_DEFAULT) -> None:
         self.name = name
@@ -149,6 +392,17 @@ class Context(t.Generic[T]):
     def provider(self, value: T, children_func: Callable[[], Node]) -> ContextProvider[T]:
         return ContextProvider(self, value, children_func)
 
+    def lazy_provider(
+        self, factory: Callable[[], T], children_func: Callable[[], Node]
+    ) -> LazyContextProvider[T]:
+        """Provide the value returned by factory.
+
+        factory is called when the value is first consumed and the value is then
+        reused by all consumers in the same render. If there are no consumers,
+        factory is never called.
+        """
+        return LazyContextProvider(self, factory, children_func)
+
     def consumer(
         self,
         func: Callable[t.Concatenate[T, P], Node],
@@ -160,44 +414,870 @@ class Context(t.Generic[T]):
         return wrapper
 
 
-def iter_node(x: Node) -> Iterator[str]:
-    return _iter_node_context(x, {})
+# (children iterator, context, end tag, children, element or cache() fragment to
+# cache and the position of its first chunk), see _iter_node_context and _render_node_context.
+_Frame: t.TypeAlias = tuple[
+    Iterator[t.Any], _ProvidedContext | None, str, t.Any, tuple[t.Any, int] | None
+]
 
 
-def _iter_node_context(x: Node, context_dict: dict[Context[t.Any], t.Any]) -> Iterator[str]:
-    while not isinstance(x, BaseElement) and callable(x):
-        x = x()
+def iter_node(
+    x: Node, *, executor: concurrent.futures.Executor | None = None, lookahead: int = 8
+) -> Generator[str, None, None]:
+    """Render node to an iterator of chunks.
 
-    if x is None:
-        return
+    With an executor, callables among the children of elements and lists are
+    rendered in the executor, up to lookahead siblings before they are
+    reached, while the chunks are still produced in document order. Use it
+    when callables do blocking I/O, like database queries. The active context
+    values and a copy of the contextvars are passed to the workers.
+    """
+    return _without_flush(
+        _iter_node_context(x, None, defer=True, offloader=_offloader(executor, lookahead))
+    )
 
-    if x is True:
-        return
 
-    if x is False:
-        return
+def _without_flush(chunks: Generator[str, None, None]) -> Generator[str, None, None]:
+    # The flush() marker is only for _iter_blocks, iter_node() produces plain
+    # str chunks.
+    try:
+        for chunk in chunks:
+            if chunk is not _FLUSH:
+                yield chunk
+    finally:
+        chunks.close()
+
+
+def _offloader(executor: concurrent.futures.Executor | None, lookahead: int) -> _Offloader | None:
+    if executor is None:
+        return None
+    if lookahead < 1:
+        raise ValueError(f"lookahead must be at least 1, got {lookahead!r}")
+    return _Offloader(executor, lookahead)
+
+
+class _Offloaded:
+    """Stands in for a callable that is rendered in an executor, see iter_node."""
+
+    __slots__ = ("future",)
 
-    if isinstance(x, BaseElement):
-        yield from x._iter_context(context_dict)  # pyright: ignore [reportPrivateUsage]
-    elif isinstance(x, ContextProvider):
-        yield from _iter_node_context(x.func(), {**context_dict, x.context: x.value})  # pyright: ignore [reportUnknownMemberType]
-    elif isinstance(x, ContextConsumer):
-        context_value = context_dict.get(x.context, x.context.default)
-        if context_value is _NO_DEFAULT:
-            raise LookupError(
-                f'Context value for "{x.context.name}" does not exist, '
-                f"requested by {x.debug_name}()."
+    def __init__(self, future: concurrent.futures.Future[str]) -> None:
+        self.future = future
+
+
+class _Offloader:
+    """Renders callables in an executor for a single streamed render.
+
+    pending holds the futures that have been submitted but not used yet. They
+    are cancelled when the render stops early.
+    """
+
+    __slots__ = ("executor", "lookahead", "pending")
+
+    def __init__(self, executor: concurrent.futures.Executor, lookahead: int) -> None:
+        self.executor = executor
+        self.lookahead = lookahead
+        self.pending: set[concurrent.futures.Future[str]] = set()
+
+    def children(
+        self, children: tuple[t.Any, ...] | list[t.Any], provided_context: _ProvidedContext | None
+    ) -> Iterator[t.Any]:
+        return _OffloadedChildren(self, children, provided_context)
+
+    def submit(self, func: t.Any, provided_context: _ProvidedContext | None) -> _Offloaded:
+        future = self.executor.submit(
+            contextvars.copy_context().run, _render_node_context, func, provided_context
+        )
+        self.pending.add(future)
+        return _Offloaded(future)
+
+    def result(self, offloaded: _Offloaded) -> str:
+        self.pending.discard(offloaded.future)
+        return offloaded.future.result()
+
+    def close(self) -> None:
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+
+
+class _OffloadedChildren:
+    """Iterates over children, with the callables up to lookahead siblings
+    ahead submitted to the executor."""
+
+    __slots__ = ("offloader", "children", "provided_context", "index", "ahead", "offloaded")
+
+    def __init__(
+        self,
+        offloader: _Offloader,
+        children: tuple[t.Any, ...] | list[t.Any],
+        provided_context: _ProvidedContext | None,
+    ) -> None:
+        self.offloader = offloader
+        self.children = children
+        self.provided_context = provided_context
+        self.index = 0
+        self.ahead = 0
+        self.offloaded: dict[int, _Offloaded] = {}
+
+    def __iter__(self) -> _OffloadedChildren:
+        return self
+
+    def __next__(self) -> t.Any:
+        index = self.index
+        children = self.children
+        if index >= len(children):
+            raise StopIteration
+        end = min(index + self.offloader.lookahead, len(children))
+        while self.ahead < end:
+            child = children[self.ahead]
+            if _node_kinds[type(child)] is _CALLABLE:
+                self.offloaded[self.ahead] = self.offloader.submit(child, self.provided_context)
+            self.ahead += 1
+        self.index = index + 1
+        return self.offloaded.pop(index, children[index])
+
+    def __length_hint__(self) -> int:
+        return len(self.children) - self.index
+
+
+async def aiter_node(x: Node, *, concurrency: int | None = 1) -> AsyncGenerator[str, None]:
+    """Render node asynchronously.
+
+    In addition to all other nodes, awaitables (like coroutines) and async
+    iterables (like async generators) can be used as children. They are awaited
+    and iterated when they are reached, without blocking the event loop. Async
+    functions can be used as children just like regular callables.
+
+    With a concurrency above 1, awaitables and async functions among the
+    children of an element or list are started as tasks as soon as their parent
+    is reached, with at most concurrency of them running at a time (None for no
+    limit). The output is still in document order.
+    """
+    if concurrency is not None and concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1 or None, got {concurrency!r}")
+
+    tasks: list[asyncio.Future[t.Any]] = []
+    start = _task_starter(concurrency, tasks) if concurrency != 1 else None
+
+    # Yields _Await as well as str when asynchronous=True.
+    chunks: Generator[t.Any, t.Any, None] = _iter_node_context(
+        x, None, asynchronous=True, start=start, defer=True
+    )
+    send: t.Any = None
+    try:
+        while True:
+            try:
+                chunk = chunks.send(send)
+            except StopIteration:
+                return
+            if type(chunk) is _Await:
+                send = await chunk.awaitable
+            else:
+                send = None
+                if chunk is not _FLUSH:
+                    yield chunk
+    finally:
+        chunks.close()
+        # Tasks that were started but not reached when rendering stopped early.
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()
+
+
+def _task_starter(
+    concurrency: int | None, tasks: list[asyncio.Future[t.Any]]
+) -> Callable[[Awaitable[t.Any]], Awaitable[t.Any]]:
+    # Returns a function that runs an awaitable as a task, at most concurrency
+    # at a time, and keeps track of it in tasks. Imported here since importing
+    # asyncio takes longer than importing htpy itself.
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency) if concurrency is not None else None
+
+    async def limited(awaitable: Awaitable[t.Any]) -> t.Any:
+        assert semaphore is not None
+        async with semaphore:
+            return await awaitable
+
+    def start(awaitable: Awaitable[t.Any]) -> Awaitable[t.Any]:
+        task = asyncio.ensure_future(limited(awaitable) if semaphore else awaitable)
+        tasks.append(task)
+        return task
+
+    return start
+
+
+class _Await:
+    """Yielded by _iter_node_context to have aiter_node await awaitable.
+
+    The result is sent back into the generator.
+    """
+
+    __slots__ = ("awaitable",)
+
+    def __init__(self, awaitable: Awaitable[t.Any]) -> None:
+        self.awaitable = awaitable
+
+
+class _ASYNC_END:
+    pass
+
+
+def _async_children(iterable: AsyncIterable[t.Any]) -> Iterator[Awaitable[t.Any]]:
+    # Turn an async iterable into awaitable children that resolve to its items
+    # and then to _ASYNC_END.
+    iterator = aiter(iterable)
+    while True:
+        yield anext(iterator, _ASYNC_END)
+
+
+def _start_children(
+    children: tuple[t.Any, ...] | list[t.Any],
+    start: Callable[[Awaitable[t.Any]], Awaitable[t.Any]],
+) -> tuple[t.Any, ...] | list[t.Any]:
+    # Start the awaitables and async functions among children, see aiter_node.
+    # The children are rendered in order and the engine awaits the started
+    # tasks as they are reached.
+    started: list[t.Any] | None = None
+    for index, child in enumerate(children):
+        kind = _node_kinds[type(child)]
+        if kind is _CALLABLE and inspect.iscoroutinefunction(child):
+            child = child()
+        elif kind is not _AWAITABLE:
+            continue
+        if started is None:
+            started = list(children)
+        started[index] = start(child)
+    return children if started is None else started
+
+
+class _Deferred:
+    __slots__ = ("fallback", "node")
+
+    def __init__(self, fallback: Node, node: Node) -> None:
+        self.fallback = fallback
+        self.node = node
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> _Markup:
+        return render_node(self)
+
+    def __repr__(self) -> str:
+        return f"deferred({self.fallback!r}, {self.node!r})"
+
+
+def deferred(fallback: Node, node: Node) -> _Deferred:
+    """Stream fallback in place of a slow node and send node when it is ready.
+
+    When streaming, node is rendered concurrently with the rest of the page, in
+    a thread with iter_node() and friends or in a task with aiter_node(). The
+    rendered node is sent in a <template> before </body> (or at the end of the
+    stream) with a small inline script that replaces the fallback with it.
+    str() and render_node() render node in place.
+    """
+    return _Deferred(fallback, node)
+
+
+# Replaces the nodes between <!--htpy:{key}--> and <!--/htpy:{key}--> with the
+# contents of <template id="htpy:{key}">.
+_SWAP_SCRIPT = (
+    "<script>function htpySwap(k){"
+    'var t=document.getElementById("htpy:"+k),w=document.createTreeWalker(document,128),s,n;'
+    'while((s=w.nextNode())&&s.data!="htpy:"+k);'
+    'var p=s.parentNode;while((n=s.nextSibling).data!="/htpy:"+k)p.removeChild(n);'
+    "p.replaceChild(t.content,s);p.removeChild(n);t.remove()}</script>"
+)
+
+
+class _Deferrals:
+    """The deferred nodes of a streamed render, see deferred().
+
+    Sync renders resolve them in a thread pool and async renders in tasks.
+    pending holds futures or tasks that resolve to (key, html), in document
+    order, until they have been emitted. They are cancelled when the render
+    stops early.
+    """
+
+    __slots__ = (
+        "asynchronous",
+        "start_task",
+        "token",
+        "count",
+        "pending",
+        "executor",
+        "script_sent",
+    )
+
+    def __init__(
+        self,
+        asynchronous: bool,
+        start_task: Callable[[Awaitable[t.Any]], Awaitable[t.Any]] | None,
+    ) -> None:
+        self.asynchronous = asynchronous
+        self.start_task = start_task
+        # Keys must be unique if several streams end up in the same page.
+        self.token = secrets.token_hex(4)
+        self.count = 0
+        self.pending: list[t.Any] = []
+        self.executor: t.Any = None
+        self.script_sent = False
+
+    def start(self, x: _Deferred, provided_context: _ProvidedContext | None) -> str:
+        self.count += 1
+        key = f"{self.token}-{self.count}"
+        if self.asynchronous:
+            import asyncio
+
+            self.pending.append(
+                asyncio.ensure_future(
+                    _arender_deferred(key, x.node, provided_context, self.start_task)
+                )
             )
-        yield from _iter_node_context(x.func(context_value), context_dict)
-    elif isinstance(x, str | _HasHtml):
-        yield str(_escape(x))
-    elif isinstance(x, int):
-        yield str(x)
-    elif isinstance(x, Iterable) and not isinstance(x, _KnownInvalidChildren):  # pyright: ignore [reportUnnecessaryIsInstance]
-        for child in x:
-            yield from _iter_node_context(child, context_dict)
-    else:
-        raise ValueError(f"{x!r} is not a valid child element")
+        else:
+            if self.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self.executor = ThreadPoolExecutor(thread_name_prefix="htpy-deferred")
+            self.pending.append(
+                self.executor.submit(
+                    contextvars.copy_context().run,
+                    _render_deferred,
+                    key,
+                    x.node,
+                    provided_context,
+                )
+            )
+        return key
+
+    def wait(self) -> t.Any:
+        # Waits until at least one pending node is done and returns (done, not
+        # done). For async renders, an awaitable of it is returned.
+        if self.asynchronous:
+            import asyncio
+
+            return asyncio.wait(self.pending, return_when=asyncio.FIRST_COMPLETED)
+
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        return wait(self.pending, return_when=FIRST_COMPLETED)
+
+    def close(self) -> None:
+        for future in self.pending:
+            future.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_deferred(
+    key: str, node: Node, provided_context: _ProvidedContext | None
+) -> tuple[str, str]:
+    return key, _render_node_context(node, provided_context)
+
+
+async def _arender_deferred(
+    key: str,
+    node: Node,
+    provided_context: _ProvidedContext | None,
+    start: Callable[[Awaitable[t.Any]], Awaitable[t.Any]] | None,
+) -> tuple[str, str]:
+    # Like aiter_node, but collected into a string. Nested deferred nodes are
+    # rendered in place.
+    chunks: Generator[t.Any, t.Any, None] = _iter_node_context(
+        node, provided_context, asynchronous=True, start=start
+    )
+    out: list[str] = []
+    send: t.Any = None
+    try:
+        while True:
+            try:
+                chunk = chunks.send(send)
+            except StopIteration:
+                return key, "".join(out)
+            if type(chunk) is _Await:
+                send = await chunk.awaitable
+            else:
+                send = None
+                out.append(chunk)
+    finally:
+        chunks.close()
+
+
+def _iter_resolved(deferrals: _Deferrals) -> Generator[str, t.Any, None]:
+    # Send what has been rendered so far (see _iter_blocks) before waiting for
+    # the deferred nodes.
+    yield _FLUSH
+    while deferrals.pending:
+        if deferrals.asynchronous:
+            done, _ = yield t.cast("str", _Await(deferrals.wait()))
+        else:
+            done, _ = deferrals.wait()
+        for future in [future for future in deferrals.pending if future in done]:
+            key, html = future.result()
+            # Removed once it is emitted, so that the rest are still cancelled
+            # when the stream is closed.
+            deferrals.pending.remove(future)
+            if not deferrals.script_sent:
+                deferrals.script_sent = True
+                yield _SWAP_SCRIPT
+            yield f'<template id="htpy:{key}">{html}</template><script>htpySwap("{key}")</script>'
+
+
+def _iter_node_context(
+    node: Node,
+    provided_context: _ProvidedContext | None,
+    *,
+    asynchronous: bool = False,
+    start: Callable[[Awaitable[t.Any]], Awaitable[t.Any]] | None = None,
+    defer: bool = False,
+    offloader: _Offloader | None = None,
+    deferrals: _Deferrals | None = None,
+    nested: bool = False,
+) -> Generator[str, t.Any, None]:
+    # Walk the tree with an explicit stack rather than one nested generator per
+    # element. Every frame is (children iterator, context, end tag, children)
+    # and the end tag is emitted when the iterator is exhausted. This keeps the cost of a
+    # chunk independent of the tree depth and avoids RecursionError for very
+    # deep trees.
+    #
+    # With asynchronous=True, awaitables are yielded as _Await and the result
+    # must be sent back, see aiter_node. start is used to run sibling
+    # awaitables concurrently. With defer=True, deferred() nodes are resolved
+    # concurrently and emitted at the end, otherwise they are rendered in place.
+    # offloader renders callables in an executor, see iter_node. A nested walk
+    # shares deferrals and offloader with the walk it is part of, which
+    # resolves and closes them, see _iter_cached.
+    node_kinds = _node_kinds
+    escape_text = _escape_text
+    root = (node,)
+    stack: list[_Frame] = [(iter(root), provided_context, "", root, None)]
+
+    try:
+        while stack:
+            frame = stack.pop()
+            children, provided_context, end_tag, _, _ = frame
+
+            for x in children:
+                kind = node_kinds[type(x)]
+                while kind is _CALLABLE:
+                    x = x()
+                    kind = node_kinds[type(x)]
+
+                if kind is _TEXT:
+                    yield escape_text(x)
+                elif kind is _ELEMENT or kind is _HTML_ELEMENT:
+                    rendered = x._rendered
+                    if rendered:
+                        # A static element that has been rendered before, see
+                        # BaseElement.__init__. The buffered renderer caches it.
+                        yield rendered if rendered is not True else _render_node_context(x, None)
+                        continue
+                    if rendered is None:
+                        x._rendered = True
+
+                    element_children: t.Any = x._children
+                    if start is not None and type(element_children) in (tuple, list):
+                        # Start async children before the start tag is sent.
+                        element_children = _start_children(element_children, start)
+
+                    if kind is _HTML_ELEMENT:
+                        yield "<!doctype html>"
+
+                    yield f"<{x._name}{x._attrs}>"
+                    children_kind = node_kinds[type(element_children)]
+                    if children_kind is _IGNORE or children_kind is _TEXT:
+                        if children_kind is _TEXT:
+                            yield escape_text(element_children)
+                        yield f"</{x._name}>"
+                        continue
+
+                    if type(element_children) not in (tuple, list):
+                        element_children = (element_children,)
+
+                    stack.append(frame)
+                    stack.append(
+                        (
+                            iter(element_children)
+                            if offloader is None
+                            else offloader.children(element_children, provided_context),
+                            provided_context,
+                            f"</{x._name}>",
+                            element_children,
+                            None,
+                        )
+                    )
+                    break
+                elif kind is _ITERABLE:
+                    if start is not None and type(x) in (tuple, list):
+                        x = _start_children(x, start)
+                    stack.append(frame)
+                    if offloader is not None and type(x) in (tuple, list):
+                        stack.append(
+                            (offloader.children(x, provided_context), provided_context, "", x, None)
+                        )
+                    else:
+                        stack.append((iter(x), provided_context, "", x, None))
+                    break
+                elif kind is _INT:
+                    yield str(x)
+                elif kind is _HTML:
+                    # Markup and other objects with __html__ are already safe.
+                    # Chunks are plain str, so that adding them to a str does
+                    # not escape them again. The flush() marker is kept for
+                    # _iter_blocks.
+                    html = x.__html__()
+                    yield html if type(html) is str or html is _FLUSH else str(html)
+                elif kind is _IGNORE:
+                    continue
+                elif kind is _VOID_ELEMENT:
+                    yield f"<{x._name}{x._attrs}>"
+                elif kind is _CONTEXT_PROVIDER:
+                    stack.append(frame)
+                    provided = (x.func(),)
+                    stack.append(
+                        (
+                            iter(provided),
+                            x._provide(provided_context),
+                            "",
+                            provided,
+                            None,
+                        )
+                    )
+                    break
+                elif kind is _CONTEXT_CONSUMER:
+                    stack.append(frame)
+                    consumed = (_consume_context(x, provided_context),)
+                    stack.append((iter(consumed), provided_context, "", consumed, None))
+                    break
+                elif kind is _CUSTOM_ELEMENT:
+                    # Subclasses that customize rendering are delegated to.
+                    yield from x._iter_context(provided_context)
+                elif kind is _CUSTOM_CONTAINER:
+                    # The nodes it contains are rendered by a nested walk, like
+                    # the rest of the tree, see _iter_cached.
+                    if defer and deferrals is None:
+                        deferrals = _Deferrals(asynchronous, start)
+                    yield from x._iter_walk(
+                        provided_context,
+                        functools.partial(
+                            _iter_node_context,
+                            asynchronous=asynchronous,
+                            start=start,
+                            defer=defer,
+                            offloader=offloader,
+                            deferrals=deferrals,
+                            nested=True,
+                        ),
+                    )
+                elif kind is _AWAITABLE and asynchronous:
+                    result = yield t.cast("str", _Await(x))
+                    if result is _ASYNC_END:
+                        # The async iterable of this frame is exhausted.
+                        break
+                    stack.append(frame)
+                    awaited = (result,)
+                    stack.append((iter(awaited), provided_context, "", awaited, None))
+                    break
+                elif kind is _ASYNC_ITERABLE and asynchronous:
+                    stack.append(frame)
+                    stack.append((_async_children(x), provided_context, "", x, None))
+                    break
+                elif kind is _DEFERRED:
+                    stack.append(frame)
+                    if defer:
+                        if deferrals is None:
+                            deferrals = _Deferrals(asynchronous, start)
+                        key = deferrals.start(x, provided_context)
+                        yield f"<!--htpy:{key}-->"
+                        deferred: tuple[t.Any, ...] = (
+                            x.fallback,
+                            _Markup(f"<!--/htpy:{key}-->"),
+                        )
+                    else:
+                        deferred = (x.node,)
+                    stack.append((iter(deferred), provided_context, "", deferred, None))
+                    break
+                elif kind is _OFFLOADED and offloader is not None:
+                    yield offloader.result(x)
+                elif kind is _CACHED:
+                    html = x.get()
+                    if html is not None:
+                        yield html
+                        continue
+                    if defer and deferrals is None:
+                        deferrals = _Deferrals(asynchronous, start)
+                    yield from _iter_cached(
+                        x, provided_context, asynchronous, start, deferrals, offloader
+                    )
+                elif kind is _DYNAMIC and (node := _dynamic_node(x)) is not x:
+                    stack.append(frame)
+                    dynamic = (node,)
+                    stack.append((iter(dynamic), provided_context, "", dynamic, None))
+                    break
+                else:
+                    raise _invalid_child_error(x, [*stack, frame])
+            else:
+                if end_tag:
+                    if deferrals is not None and deferrals.pending and end_tag == "</body>":
+                        yield from _iter_resolved(deferrals)
+                    yield end_tag
+
+        if deferrals is not None and deferrals.pending and not nested:
+            yield from _iter_resolved(deferrals)
+    finally:
+        if not nested:
+            if deferrals is not None:
+                deferrals.close()
+            if offloader is not None:
+                offloader.close()
+
+
+def _iter_cached(
+    fragment: _CachedFragment,
+    provided_context: _ProvidedContext | None,
+    asynchronous: bool,
+    start: Callable[[Awaitable[t.Any]], Awaitable[t.Any]] | None,
+    deferrals: _Deferrals | None,
+    offloader: _Offloader | None,
+) -> Generator[str, t.Any, None]:
+    # Streams a fragment that is not in the cache like the rest of the walk and
+    # stores its HTML when it has been rendered completely. Chunks are yielded
+    # rather than collected, so the fragment is walked by a nested walk. A
+    # fragment with deferred nodes only contains their fallbacks and is not
+    # stored.
+    chunks: Generator[t.Any, t.Any, None] = _iter_node_context(
+        fragment.node,
+        provided_context,
+        asynchronous=asynchronous,
+        start=start,
+        defer=deferrals is not None,
+        offloader=offloader,
+        deferrals=deferrals,
+        nested=True,
+    )
+    deferred_count = deferrals.count if deferrals is not None else 0
+    out: list[str] = []
+    send: t.Any = None
+    try:
+        while True:
+            try:
+                chunk = chunks.send(send)
+            except StopIteration:
+                break
+            if type(chunk) is _Await:
+                send = yield t.cast("str", chunk)
+            else:
+                if chunk is not _FLUSH:
+                    out.append(chunk)
+                send = yield chunk
+    finally:
+        chunks.close()
+
+    if deferrals is None or deferrals.count == deferred_count:
+        fragment.store("".join(out))
+
+
+def _render_node_context(node: Node, provided_context: _ProvidedContext | None) -> str:
+    # The non-streaming counterpart of _iter_node_context: the same walk, but
+    # chunks are appended to a single list that is joined once at the end.
+    # Keep the two in sync.
+    node_kinds = _node_kinds
+    escape_text = _escape_text
+    out: list[str] = []
+    append = out.append
+    root = (node,)
+    stack: list[_Frame] = [(iter(root), provided_context, "", root, None)]
+    caching = False
+
+    while stack:
+        frame = stack.pop()
+        children, provided_context, end_tag, _, cache = frame
+
+        for x in children:
+            kind = node_kinds[type(x)]
+            while kind is _CALLABLE:
+                x = x()
+                kind = node_kinds[type(x)]
+
+            if kind is _TEXT:
+                append(escape_text(x))
+            elif kind is _ELEMENT or kind is _HTML_ELEMENT:
+                element_cache = None
+                rendered = x._rendered
+                if rendered:
+                    # A static element that has been rendered before, see
+                    # BaseElement.__init__. Elements that are rendered more than
+                    # once, like shared module level trees, are cached the
+                    # second time. Nested static elements are part of the
+                    # cached HTML and are not cached separately.
+                    if rendered is not True:
+                        append(rendered)
+                        continue
+                    if not caching:
+                        element_cache = (x, len(out))
+                elif rendered is None:
+                    x._rendered = True
+
+                if kind is _HTML_ELEMENT:
+                    append("<!doctype html>")
+
+                append(f"<{x._name}{x._attrs}>")
+                element_children = x._children
+                children_kind = node_kinds[type(element_children)]
+                if children_kind is _IGNORE or children_kind is _TEXT:
+                    if children_kind is _TEXT:
+                        append(escape_text(element_children))
+                    append(f"</{x._name}>")
+                    if element_cache is not None:
+                        x._rendered = "".join(out[element_cache[1] :])
+                    continue
+
+                if type(element_children) not in (tuple, list):
+                    element_children = (element_children,)
+
+                if element_cache is not None:
+                    caching = True
+                stack.append(frame)
+                stack.append(
+                    (
+                        iter(element_children),
+                        provided_context,
+                        f"</{x._name}>",
+                        element_children,
+                        element_cache,
+                    )
+                )
+                break
+            elif kind is _ITERABLE:
+                stack.append(frame)
+                stack.append((iter(x), provided_context, "", x, None))
+                break
+            elif kind is _INT:
+                append(str(x))
+            elif kind is _HTML:
+                append(x.__html__())
+            elif kind is _IGNORE:
+                continue
+            elif kind is _VOID_ELEMENT:
+                append(f"<{x._name}{x._attrs}>")
+            elif kind is _CONTEXT_PROVIDER:
+                stack.append(frame)
+                provided = (x.func(),)
+                stack.append(
+                    (
+                        iter(provided),
+                        x._provide(provided_context),
+                        "",
+                        provided,
+                        None,
+                    )
+                )
+                break
+            elif kind is _CONTEXT_CONSUMER:
+                stack.append(frame)
+                consumed = (_consume_context(x, provided_context),)
+                stack.append((iter(consumed), provided_context, "", consumed, None))
+                break
+            elif kind is _CUSTOM_ELEMENT or kind is _CUSTOM_CONTAINER:
+                out.extend(x._iter_context(provided_context))
+            elif kind is _DEFERRED:
+                # Nothing is sent before the whole page is rendered, so there
+                # is no point in a fallback.
+                if _is_tracing(provided_context):
+                    raise _TraceAbort
+                stack.append(frame)
+                deferred = (x.node,)
+                stack.append((iter(deferred), provided_context, "", deferred, None))
+                break
+            elif kind is _CACHED:
+                if _is_tracing(provided_context):
+                    # The HTML changes when the fragment expires.
+                    raise _TraceAbort
+                html = x.get()
+                if html is not None:
+                    append(html)
+                    continue
+                # Stored when the frame is done, see below. Nothing is stored
+                # if rendering fails.
+                stack.append(frame)
+                cached = (x.node,)
+                stack.append((iter(cached), provided_context, "", cached, (x, len(out))))
+                break
+            elif kind is _DYNAMIC and (node := _dynamic_node(x)) is not x:
+                stack.append(frame)
+                dynamic = (node,)
+                stack.append((iter(dynamic), provided_context, "", dynamic, None))
+                break
+            else:
+                raise _invalid_child_error(x, [*stack, frame])
+        else:
+            if end_tag:
+                append(end_tag)
+            if cache is not None:
+                owner, start = cache
+                if type(owner) is _CachedFragment:
+                    owner.store("".join(out[start:]))
+                else:
+                    owner._rendered = "".join(out[start:])
+                    caching = False
+
+    return "".join(out)
+
+
+def _invalid_child_error(x: t.Any, stack: list[_Frame]) -> ValueError:
+    # Describe where in the tree the invalid child was found, for instance
+    # "html > body > table > tbody > tr[4312] > td". The index is the position
+    # of the element in its parent's children when it is one of several.
+    path: list[str] = []
+    index = ""
+    for children_iter, _, end_tag, children, _ in stack:
+        if end_tag:
+            path.append(f"{end_tag[2:-1]}{index}")
+
+        index = ""
+        if type(children) in (tuple, list) and len(children) > 1:
+            index = f"[{len(children) - operator.length_hint(children_iter) - 1}]"
+
+    hint = ""
+    if _node_kinds[type(x)] in (_AWAITABLE, _ASYNC_ITERABLE):
+        hint = ", use aiter_node() to render async children"
+
+    if not path:
+        return ValueError(f"{x!r} is not a valid child element{hint}")
+
+    return ValueError(f"{x!r} is not a valid child element in {' > '.join(path)}{hint}")
+
+
+def _is_tracing(provided_context: _ProvidedContext | None) -> bool:
+    while provided_context is not None:
+        if provided_context.context is _TRACING_CONTEXT:
+            return True
+        provided_context = provided_context.parent
+    return False
+
+
+def _consume_context(x: ContextConsumer[t.Any], provided_context: _ProvidedContext | None) -> Node:
+    while provided_context is not None:
+        if provided_context.context is x.context:
+            value = provided_context.value
+            if type(value) is _LazyContextValue:
+                value = provided_context.value = value.get()
+            return x.func(value)
+        if provided_context.context is _TRACING_CONTEXT:
+            # The value depends on where the traced component is used.
+            raise _TraceAbort
+        provided_context = provided_context.parent
+
+    context_value = x.context.default
+    if context_value is _NO_DEFAULT:
+        raise LookupError(
+            f'Context value for "{x.context.name}" does not exist, requested by {x.debug_name}().'
+        )
+    return x.func(context_value)
 
 
 @functools.lru_cache(maxsize=300)
@@ -214,15 +1294,28 @@ def __getattr__(name: str) -> Element:
 
 
 class BaseElement:
-    __slots__ = ("_name", "_attrs", "_children")
+    __slots__ = ("_name", "_attrs", "_children", "_rendered")
 
     def __init__(self, name: str, attrs_str: str = "", children: Node = None) -> None:
         self._name = name
         self._attrs = attrs_str
         self._children = children
 
+        # Elements are immutable, so an element that only contains static
+        # nodes always renders the same and can be cached. _rendered is:
+        #   False: not static
+        #   "": static, but too cheap to render to be worth caching on its own
+        #   None: static and not rendered yet
+        #   True: static and rendered once
+        #   any other str: the cached HTML
+        self._rendered: str | bool | None
+        if children is None or type(children) is str:
+            self._rendered = ""
+        else:
+            self._rendered = None if _is_static(children) else False
+
     def __str__(self) -> _Markup:
-        return _Markup("".join(str(x) for x in self))
+        return _Markup(_render_node_context(self, None))
 
     @t.overload
     def __call__(
@@ -257,20 +1350,14 @@ class BaseElement:
 
         return self.__class__(
             self._name,
-            _attrs_string(
-                {
-                    **(_id_class_names_from_css_str(id_class) if id_class else {}),
-                    **attrs,
-                    **{_kwarg_attribute_name(k): v for k, v in kwargs.items()},
-                }
-            ),
+            _call_attrs_string(id_class, attrs, kwargs),
             self._children,
         )
 
     def __iter__(self) -> Iterator[str]:
-        return self._iter_context({})
+        return iter_node(self)
 
-    def _iter_context(self, ctx: dict[Context[t.Any], t.Any]) -> Iterator[str]:
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
         yield f"<{self._name}{self._attrs}>"
         yield from _iter_node_context(self._children, ctx)
         yield f"</{self._name}>"
@@ -282,7 +1369,7 @@ class BaseElement:
     # explicitly casting to str:
     # https://github.com/encode/starlette/blob/5ed55c441126687106109a3f5e051176f88cd3e6/starlette/responses.py#L44-L49
     def encode(self, encoding: str = "utf-8", errors: str = "strict") -> bytes:
-        return str(self).encode(encoding, errors)
+        return _render_node_context(self, None).encode(encoding, errors)
 
     # Avoid having Django "call" a htpy element that is injected into a
     # template. Setting do_not_call_in_templates will prevent Django from doing
@@ -292,36 +1379,668 @@ class BaseElement:
 
 
 def _validate_children(children: t.Any) -> None:
-    if isinstance(children, _KnownValidChildren):
-        return
+    kind = _node_kinds[type(children)]
+    if kind is _DYNAMIC:
+        kind = _dynamic_node_kind(children)
 
-    if isinstance(children, Iterable) and not isinstance(children, _KnownInvalidChildren):
-        for child in children:  # pyright: ignore [reportUnknownVariableType]
+    if kind is _ITERABLE and not isinstance(children, Generator):
+        for child in children:
             _validate_children(child)
-        return
+    elif kind is _INVALID:
+        raise ValueError(f"{children!r} is not a valid child element")
+
 
-    raise ValueError(f"{children!r} is not a valid child element")
+_validate_children_on_build = True
+
+
+def set_child_validation(mode: t.Literal["build", "render"]) -> None:
+    """Choose when children are validated.
+
+    "build" (the default) validates children when they are passed to an
+    element, "render" skips that and only reports invalid children when the
+    tree is rendered. Rendering walks the children anyway, so this avoids
+    traversing them twice.
+    """
+    global _validate_children_on_build
+
+    if mode not in ("build", "render"):
+        raise ValueError(f'mode must be "build" or "render", got {mode!r}')
+
+    _validate_children_on_build = mode == "build"
 
 
 class Element(BaseElement):
     def __getitem__(self: ElementSelf, children: Node) -> ElementSelf:
-        _validate_children(children)
+        if _validate_children_on_build:
+            _validate_children(children)
         return self.__class__(self._name, self._attrs, children)  # pyright: ignore [reportUnknownArgumentType]
 
 
 class HTMLElement(Element):
-    def _iter_context(self, ctx: dict[Context[t.Any], t.Any]) -> Iterator[str]:
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
         yield "<!doctype html>"
         yield from super()._iter_context(ctx)
 
 
 class VoidElement(BaseElement):
-    def _iter_context(self, ctx: dict[Context[t.Any], t.Any]) -> Iterator[str]:
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
         yield f"<{self._name}{self._attrs}>"
 
 
+_STATIC_TYPES = frozenset({str, int, bool, type(None), _Markup})
+
+
+def _is_static(children: t.Any) -> bool:
+    # Only immutable nodes that render the same every time. This runs every
+    # time an element is created, so it must stay cheap: lists and other
+    # mutable or lazy children are rejected without looking at their items.
+    children_type = type(children)  # pyright: ignore [reportUnknownVariableType]
+    if children_type in _STATIC_TYPES:
+        return True
+    kind = _node_kinds[children_type]
+    if kind is _ELEMENT or kind is _HTML_ELEMENT or kind is _VOID_ELEMENT:
+        return children._rendered is not False
+    if children_type is tuple:
+        for child in children:
+            if not _is_static(child):
+                return False
+        return True
+    return False
+
+
 def render_node(node: Node) -> _Markup:
-    return _Markup("".join(iter_node(node)))
+    return _Markup(_render_node_context(node, None))
+
+
+class _FlushMarker(_Markup):
+    __slots__ = ()
+
+
+_FLUSH = _FlushMarker()
+
+
+def flush() -> _Markup:
+    """Return a node that ends the current chunk of iter_bytes().
+
+    It renders as an empty string. Put it after </head> to send the head to
+    the browser right away, so that it can start loading CSS while the body is
+    still being rendered.
+    """
+    return _FLUSH
+
+
+def iter_bytes(
+    node: Node,
+    encoding: str = "utf-8",
+    min_chunk: int = 8192,
+    *,
+    errors: str = "strict",
+    executor: concurrent.futures.Executor | None = None,
+    lookahead: int = 8,
+) -> Iterator[bytes]:
+    """Render node to encoded chunks of at least min_chunk bytes.
+
+    Small chunks are joined and encoded together, which saves an encode call
+    and a write for every tag when streaming a response. Chunks are only
+    smaller at flush() markers and at the end of the document. See iter_node()
+    for executor and lookahead.
+    """
+    offloader = _offloader(executor, lookahead)
+    for chunk, _ in _iter_blocks(node, min_chunk, encoding, errors, offloader=offloader):
+        if chunk:
+            yield chunk
+
+
+@t.overload
+def _iter_blocks(
+    node: Node,
+    min_size: int,
+    encoding: str,
+    errors: str,
+    *,
+    flush_after_head: bool = False,
+    offloader: _Offloader | None = None,
+) -> Iterator[tuple[bytes, bool]]: ...
+@t.overload
+def _iter_blocks(
+    node: Node,
+    min_size: int,
+    encoding: None = None,
+    errors: str = "strict",
+    *,
+    flush_after_head: bool = False,
+    offloader: _Offloader | None = None,
+) -> Iterator[tuple[str, bool]]: ...
+def _iter_blocks(
+    node: Node,
+    min_size: int,
+    encoding: str | None = None,
+    errors: str = "strict",
+    *,
+    flush_after_head: bool = False,
+    offloader: _Offloader | None = None,
+) -> Iterator[tuple[t.Any, bool]]:
+    # Join the rendered chunks into blocks of at least min_size characters (and
+    # encode them if an encoding is given). Yields (block, ends at flush()).
+    # The block is empty when there is nothing new to write at a flush().
+    if min_size < 0:
+        raise ValueError("min_chunk must not be negative")
+
+    encode = codecs.getincrementalencoder(encoding)(errors).encode if encoding else None
+    buffer: list[str] = []
+    size = 0
+    for chunk in _iter_node_context(node, None, defer=True, offloader=offloader):
+        if chunk is _FLUSH:
+            flushed = True
+        else:
+            buffer.append(chunk)
+            # Every character is at least one byte, so this is a lower bound.
+            size += len(chunk)
+            flushed = flush_after_head and chunk.endswith("</head>")
+            if not flushed and size < min_size:
+                continue
+
+        block = "".join(buffer)
+        yield (encode(block) if encode else block), flushed
+        buffer.clear()
+        size = 0
+
+    final = encode("".join(buffer), True) if encode else "".join(buffer)
+    if final:
+        yield final, False
+
+
+def iter_gzip(node: Node, level: int = 6, *, encoding: str = "utf-8") -> Iterator[bytes]:
+    """Render node to a gzip compressed stream (Content-Encoding: gzip).
+
+    The page is compressed as it is rendered. The compressed data is flushed
+    after </head> and at flush() markers so that the browser can start working
+    on what has been sent so far.
+    """
+    return _iter_compressed(node, level, encoding, zlib.MAX_WBITS | 16)
+
+
+def iter_deflate(node: Node, level: int = 6, *, encoding: str = "utf-8") -> Iterator[bytes]:
+    """Render node to a zlib compressed stream (Content-Encoding: deflate).
+
+    See iter_gzip().
+    """
+    return _iter_compressed(node, level, encoding, zlib.MAX_WBITS)
+
+
+# The compressor keeps its own window, larger blocks only save Python calls.
+_COMPRESS_BLOCK_SIZE = 16384
+
+
+def _iter_compressed(node: Node, level: int, encoding: str, wbits: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    for block, flushed in _iter_blocks(
+        node, _COMPRESS_BLOCK_SIZE, encoding, "strict", flush_after_head=True
+    ):
+        data = compressor.compress(block)
+        if flushed:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def render_to(
+    node: Node,
+    target: Callable[[str], t.Any] | t.IO[str] | t.IO[bytes] | int,
+    *,
+    encoding: str = "utf-8",
+    errors: str = "strict",
+    buffer_size: int = 65536,
+) -> None:
+    """Render node to a write function, a text or binary file, or a file descriptor.
+
+    Chunks are joined into blocks of about buffer_size characters before they
+    are written, so memory use does not depend on the size of the document.
+    Binary files and file descriptors are written to with the given encoding.
+    For file descriptors, several blocks are written at once with os.writev().
+    File objects are flushed at flush() markers.
+    """
+    if buffer_size < 1:
+        raise ValueError("buffer_size must be positive")
+
+    if isinstance(target, int):
+        _render_to_fd(node, target, encoding, errors, buffer_size)
+        return
+
+    if isinstance(target, io.RawIOBase | io.BufferedIOBase) or "b" in str(
+        getattr(target, "mode", "")
+    ):
+        file = t.cast("t.IO[bytes]", target)
+        for block, flushed in _iter_blocks(node, buffer_size, encoding, errors):
+            if block:
+                file.write(block)
+            if flushed:
+                file.flush()
+        return
+
+    if callable(target):
+        for text, _ in _iter_blocks(node, buffer_size):
+            if text:
+                target(text)
+        return
+
+    text_file = t.cast("t.IO[str]", target)
+    for text, flushed in _iter_blocks(node, buffer_size):
+        if text:
+            text_file.write(text)
+        if flushed:
+            text_file.flush()
+
+
+# Blocks written to a file descriptor are encoded in smaller blocks and written
+# together with one os.writev() call.
+_FD_BLOCK_SIZE = 8192
+
+
+def _render_to_fd(node: Node, fd: int, encoding: str, errors: str, buffer_size: int) -> None:
+    try:
+        iov_max = os.sysconf("SC_IOV_MAX")
+    except (AttributeError, ValueError, OSError):
+        iov_max = 1024
+    if iov_max <= 0:
+        iov_max = 1024
+
+    pending: list[bytes] = []
+    pending_size = 0
+    block_size = min(buffer_size, _FD_BLOCK_SIZE)
+    for block, flushed in _iter_blocks(node, block_size, encoding, errors):
+        if block:
+            pending.append(block)
+            pending_size += len(block)
+        if flushed or pending_size >= buffer_size or len(pending) >= iov_max:
+            _write_all(fd, pending)
+            pending = []
+            pending_size = 0
+
+    _write_all(fd, pending)
+
+
+def _write_all(fd: int, buffers: list[bytes]) -> None:
+    if not hasattr(os, "writev"):
+        data = memoryview(b"".join(buffers))
+        while data:
+            data = data[os.write(fd, data) :]
+        return
+
+    views = [memoryview(buffer) for buffer in buffers]
+    while views:
+        written = os.writev(fd, views)
+        # Drop the buffers that were written completely and continue with the
+        # rest of a partially written one.
+        done = 0
+        while done < len(views) and written >= len(views[done]):
+            written -= len(views[done])
+            done += 1
+        del views[:done]
+        if written:
+            views[0] = views[0][written:]
+
+
+def prefetch(iterable: Iterable[T], buffer: int = 64) -> Iterator[T]:
+    """Iterate over iterable in a background thread while the items are rendered.
+
+    Up to buffer items are fetched ahead of the renderer. Use it for children
+    that are slow to produce, like rows from a database cursor, so that fetching
+    the next rows and rendering the previous ones overlap. The iterable is
+    iterated in a copy of the current contextvars and exceptions are raised
+    where the item would have been.
+    """
+    if buffer < 1:
+        raise ValueError(f"buffer must be at least 1, got {buffer!r}")
+    return _prefetch(iterable, buffer)
+
+
+class _PrefetchError:
+    __slots__ = ("exception",)
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception = exception
+
+
+class _PREFETCH_END:
+    pass
+
+
+def _prefetch(iterable: Iterable[T], buffer: int) -> Generator[T, None, None]:
+    import queue
+
+    items: queue.Queue[t.Any] = queue.Queue(buffer)
+    stop = threading.Event()
+
+    def produce() -> None:
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                items.put(item)
+                if stop.is_set():
+                    return
+            items.put(_PREFETCH_END)
+        except BaseException as exc:
+            items.put(_PrefetchError(exc))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(
+        target=contextvars.copy_context().run, args=(produce,), name="htpy-prefetch", daemon=True
+    )
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _PREFETCH_END:
+                return
+            if type(item) is _PrefetchError:
+                raise item.exception
+            yield item
+    finally:
+        # Let a producer that is blocked on a full queue see that it should stop.
+        stop.set()
+        while True:
+            try:
+                items.get_nowait()
+            except queue.Empty:
+                break
+
+
+def render_parallel(
+    rows: Iterable[T],
+    row_component: Callable[[T], Node],
+    *,
+    processes: int | None = None,
+    shard_size: int = 1000,
+) -> Iterator[_Markup]:
+    """Render row_component(row) for each row in a pool of processes.
+
+    The rows are sent to the processes in shards of shard_size rows and the
+    rendered shards are streamed back in order, with one shard per process in
+    flight. row_component must be importable by reference, like a function at
+    the module level, and the rows must be picklable. processes defaults to the
+    number of CPUs.
+    """
+    if shard_size < 1:
+        raise ValueError(f"shard_size must be at least 1, got {shard_size!r}")
+    if processes is not None and processes < 1:
+        raise ValueError(f"processes must be at least 1, got {processes!r}")
+
+    import pickle
+
+    try:
+        pickle.dumps(row_component)
+    except (pickle.PicklingError, AttributeError, TypeError) as exc:
+        raise TypeError(
+            "render_parallel() needs a row_component that can be imported by reference, "
+            f"like a function at the module level, got {row_component!r}"
+        ) from exc
+
+    return _render_parallel(rows, row_component, processes or os.cpu_count() or 1, shard_size)
+
+
+def _render_parallel(
+    rows: Iterable[T], row_component: Callable[[T], Node], processes: int, shard_size: int
+) -> Generator[_Markup, None, None]:
+    import itertools
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    iterator = iter(rows)
+    executor = ProcessPoolExecutor(processes)
+    in_flight: deque[concurrent.futures.Future[str]] = deque()
+    try:
+        while True:
+            while len(in_flight) < processes:
+                shard = list(itertools.islice(iterator, shard_size))
+                if not shard:
+                    break
+                in_flight.append(executor.submit(_render_shard, row_component, shard))
+            if not in_flight:
+                return
+            yield _Markup(in_flight.popleft().result())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_shard(row_component: Callable[[t.Any], Node], rows: list[t.Any]) -> str:
+    return _render_node_context((row_component(row) for row in rows), None)
+
+
+def json_script(
+    data: t.Any, id: str | None = None, *, encoder: type[json.JSONEncoder] | None = None
+) -> _JsonScript:
+    """Embed data as JSON in <script type="application/json">.
+
+    The JSON is streamed while it is encoded, so large payloads are neither
+    built up front nor copied. <, > and & are written as \\u003c, \\u003e and
+    \\u0026, which keeps the script element from being closed early and is
+    still the same JSON. Read it with
+    JSON.parse(document.getElementById(id).textContent).
+    """
+    return _JsonScript(data, id, encoder)
+
+
+class _JsonScript:
+    __slots__ = ("data", "encoder", "_attrs")
+
+    def __init__(self, data: t.Any, id: str | None, encoder: type[json.JSONEncoder] | None) -> None:
+        self.data = data
+        self.encoder = encoder
+        self._attrs = _attrs_string({"id": id, "type": "application/json"})
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> _Markup:
+        return render_node(self)
+
+    def __repr__(self) -> str:
+        return f"<json_script{self._attrs}>"
+
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
+        yield f"<script{self._attrs}>"
+        encode = (self.encoder or json.JSONEncoder)(separators=(",", ":")).encode
+        block: list[str] = []
+        size = 0
+        for chunk in _iter_json(self.data, encode, set()):
+            block.append(chunk)
+            size += len(chunk)
+            if size >= _JSON_BLOCK_SIZE:
+                yield _escape_json("".join(block))
+                block.clear()
+                size = 0
+        if block:
+            yield _escape_json("".join(block))
+        yield "</script>"
+
+
+_JSON_BLOCK_SIZE = 8192
+
+# Lists are encoded this many items at a time, if the items are shallow.
+_JSON_SLICE_SIZE = 1000
+
+# Containers with up to this many scalars are shallow.
+_JSON_SHALLOW_SIZE = 64
+
+_JSON_SCALAR_TYPES = frozenset({str, int, float, bool, type(None)})
+
+
+def _escape_json(value: str) -> str:
+    return value.replace("&", "\\u0026").replace("<", "\\u003c").replace(">", "\\u003e")
+
+
+def _iter_json(value: t.Any, encode: Callable[[t.Any], str], markers: set[int]) -> Iterator[str]:
+    # json.JSONEncoder.iterencode() uses the pure Python encoder, which is a lot
+    # slower than the C encoder behind encode(). Instead, walk the lists and
+    # dicts and encode shallow values, and slices of lists of shallow values,
+    # with encode(). Only a small part of the JSON exists at any time.
+    #
+    # markers holds the ids of the containers being walked, like the markers
+    # of the json encoder. Shallow containers only hold scalars and cannot
+    # refer back to them.
+    if type(value) is dict:
+        mapping = t.cast("dict[t.Any, t.Any]", value)  # type: ignore[redundant-cast]
+        if len(mapping) <= _JSON_SLICE_SIZE and all(
+            _is_shallow_json(item) for item in mapping.values()
+        ):
+            yield encode(mapping)
+            return
+        _enter_json_container(mapping, markers)
+        yield "{"
+        separator = ""
+        for key, item in mapping.items():
+            # '{"key":null}': lets json convert and escape the key.
+            yield f"{separator}{encode({key: None})[1:-5]}"
+            separator = ","
+            yield from _iter_json(item, encode, markers)
+        yield "}"
+        markers.discard(id(mapping))
+    elif type(value) in (list, tuple):
+        sequence = t.cast("list[t.Any] | tuple[t.Any, ...]", value)
+        if len(sequence) <= _JSON_SLICE_SIZE and all(_is_shallow_json(item) for item in sequence):
+            yield encode(sequence)
+            return
+        _enter_json_container(sequence, markers)
+        yield "["
+        for start in range(0, len(sequence), _JSON_SLICE_SIZE):
+            if start:
+                yield ","
+            items = sequence[start : start + _JSON_SLICE_SIZE]
+            if all(_is_shallow_json(item) for item in items):
+                yield encode(items)[1:-1]
+                continue
+            separator = ""
+            for item in items:
+                yield separator
+                separator = ","
+                yield from _iter_json(item, encode, markers)
+        yield "]"
+        markers.discard(id(sequence))
+    else:
+        yield encode(value)
+
+
+def _enter_json_container(value: t.Any, markers: set[int]) -> None:
+    marker = id(value)
+    if marker in markers:
+        raise ValueError("Circular reference detected")
+    markers.add(marker)
+
+
+def _is_shallow_json(value: t.Any) -> bool:
+    scalar_types = _JSON_SCALAR_TYPES
+    if type(value) in scalar_types:
+        return True
+    if type(value) is dict:
+        values: Collection[t.Any] = t.cast("dict[t.Any, t.Any]", value).values()  # type: ignore[redundant-cast]
+    elif type(value) in (list, tuple):
+        values = t.cast("list[t.Any] | tuple[t.Any, ...]", value)
+    else:
+        return False
+    return len(values) <= _JSON_SHALLOW_SIZE and all(type(item) in scalar_types for item in values)
+
+
+def text_file(
+    file: str | os.PathLike[str] | t.IO[str] | t.IO[bytes],
+    chunk_size: int = 65536,
+    *,
+    encoding: str = "utf-8",
+    errors: str = "strict",
+) -> _TextFile:
+    """Render the contents of a file as escaped text, like a log in <pre>.
+
+    The file is read and escaped chunk_size bytes (or characters) at a time,
+    so memory use does not depend on the size of the file. Files given by path
+    are memory-mapped when possible and opened when rendered. File objects are
+    read from their current position and are not closed, binary ones are
+    decoded with encoding.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size!r}")
+    return _TextFile(file, chunk_size, encoding, errors)
+
+
+class _TextFile:
+    __slots__ = ("file", "chunk_size", "encoding", "errors")
+
+    def __init__(
+        self,
+        file: str | os.PathLike[str] | t.IO[str] | t.IO[bytes],
+        chunk_size: int,
+        encoding: str,
+        errors: str,
+    ) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.errors = errors
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> _Markup:
+        return render_node(self)
+
+    def __repr__(self) -> str:
+        return f"text_file({self.file!r})"
+
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
+        escape_text = _escape_text
+        for text in self._iter_text():
+            if text:
+                yield escape_text(text)
+
+    def _iter_text(self) -> Iterator[str]:
+        file = self.file
+        if isinstance(file, str | os.PathLike):
+            with open(file, "rb") as binary_file:
+                yield from self._decode(self._iter_mapped(binary_file))
+            return
+
+        read = file.read
+        first = read(self.chunk_size)
+        if isinstance(first, str):
+            yield first
+            while chunk := read(self.chunk_size):
+                yield t.cast("str", chunk)
+            return
+
+        def binary_chunks() -> Iterator[bytes]:
+            chunk: t.Any = first
+            while chunk:
+                yield chunk
+                chunk = read(self.chunk_size)
+
+        yield from self._decode(binary_chunks())
+
+    def _iter_mapped(self, binary_file: t.BinaryIO) -> Iterator[bytes]:
+        import mmap
+
+        try:
+            mapped = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files and files like pipes cannot be mapped.
+            while chunk := binary_file.read(self.chunk_size):
+                yield chunk
+            return
+
+        with mapped:
+            for start in range(0, len(mapped), self.chunk_size):
+                yield mapped[start : start + self.chunk_size]
+
+    def _decode(self, chunks: Iterator[bytes]) -> Iterator[str]:
+        # The incremental decoder keeps characters that are split between two
+        # chunks until the rest of them has been read.
+        decode = codecs.getincrementaldecoder(self.encoding)(self.errors).decode
+        for chunk in chunks:
+            yield decode(chunk)
+        yield decode(b"", True)
 
 
 def comment(text: str) -> _Markup:
@@ -329,6 +2048,441 @@ def comment(text: str) -> _Markup:
     return _Markup(f"<!-- {escaped_text} -->")
 
 
+def static(node: Node) -> _Markup:
+    """Render a subtree that is the same on every request once.
+
+    Keep the result in a module level variable and use it as a child, it is
+    emitted as a single chunk. Subtrees that are not static, because they
+    contain callables, generators or other iterators, or context consumers or
+    providers, are refused with ValueError.
+    """
+    _check_static(node)
+    return render_node(node)
+
+
+def _check_static(node: Node) -> None:
+    stack: list[t.Any] = [node]
+    while stack:
+        x = stack.pop()
+        kind = _node_kinds[type(x)]
+        if isinstance(x, BaseElement):
+            stack.append(x._children)  # pyright: ignore [reportPrivateUsage]
+        elif kind is _ITERABLE:
+            if iter(x) is x:
+                raise ValueError(
+                    f"static() cannot render {x!r}: iterators can only be rendered once"
+                )
+            stack.extend(x)
+        elif kind is _CALLABLE:
+            raise ValueError(
+                f"static() cannot render {x!r}: callables may return something else on every render"
+            )
+        elif kind is _CONTEXT_PROVIDER or kind is _CONTEXT_CONSUMER:
+            raise ValueError(f"static() cannot render {x!r}: it depends on the render context")
+        elif kind is _DEFERRED:
+            raise ValueError(f"static() cannot render {x!r}: it is rendered while streaming")
+        elif type(x) is _CachedFragment:
+            raise ValueError(f"static() cannot render {x!r}: it is served from a cache")
+        elif kind is _INVALID:
+            raise ValueError(f"{x!r} is not a valid child element")
+
+
+class FragmentCacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache:
+    """An in-process cache for cache() that is bounded by size.
+
+    Keeps up to maxsize bytes of keys and HTML and evicts the least recently
+    used fragments to make room for new ones. Fragments larger than maxsize
+    are not stored. Safe to use from several threads.
+    """
+
+    def __init__(self, maxsize: int = 32 * 1024 * 1024) -> None:
+        if maxsize < 0:
+            raise ValueError("maxsize must not be negative")
+
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[str, float | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                html, expires, size = entry
+                if expires is None or _monotonic() < expires:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return html
+                del self._entries[key]
+                self._size -= size
+            self._misses += 1
+            return None
+
+    def set(self, key: str, html: str, ttl: float | None = None) -> None:
+        size = sys.getsizeof(key) + sys.getsizeof(html)
+        expires = None if ttl is None else _monotonic() + ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            if size > self.maxsize:
+                return
+            self._entries[key] = (html, expires, size)
+            self._size += size
+            while self._size > self.maxsize:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def cache_info(self) -> FragmentCacheInfo:
+        """Return hit/miss/eviction statistics and the size in bytes."""
+        return FragmentCacheInfo(
+            self._hits, self._misses, self._evictions, self.maxsize, self._size
+        )
+
+
+class CacheAdapter:
+    """Use any cache with get(key) and set(key, value, ttl) methods for cache().
+
+    For instance Django's cache framework: CacheAdapter(django.core.cache.cache).
+    Keys are prefixed with prefix. The backend takes care of expiring and
+    evicting fragments, so evictions, maxsize and currsize are reported as 0.
+    """
+
+    def __init__(self, backend: t.Any, prefix: str = "htpy:") -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> str | None:
+        html = self.backend.get(self.prefix + key)
+        if html is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if type(html) is bytes:
+            # Clients like redis-py return bytes.
+            return html.decode()
+        return str(html)
+
+    def set(self, key: str, html: str, ttl: float | None = None) -> None:
+        if ttl is None:
+            # Leave it to the backend's default timeout, None means "never
+            # expire" in Django.
+            self.backend.set(self.prefix + key, html)
+        else:
+            self.backend.set(self.prefix + key, html, ttl)
+
+    def cache_info(self) -> FragmentCacheInfo:
+        """Return hit/miss statistics."""
+        return FragmentCacheInfo(self._hits, self._misses, 0, 0, 0)
+
+
+_fragment_cache: LRUCache | CacheAdapter = LRUCache()
+
+
+def set_fragment_cache(backend: LRUCache | CacheAdapter | None = None) -> None:
+    """Replace the backend that cache() uses by default.
+
+    Call without backend to restore an LRUCache with the default size.
+    """
+    global _fragment_cache
+
+    _fragment_cache = backend or LRUCache()
+
+
+def fragment_cache_info() -> FragmentCacheInfo:
+    """Return hit/miss/eviction statistics for the default cache() backend."""
+    return _fragment_cache.cache_info()
+
+
+def cache(
+    key: str, *, ttl: float | None = None, backend: LRUCache | CacheAdapter | None = None
+) -> _CachedFragment:
+    """Render a subtree once and reuse the HTML until it expires.
+
+        cache(f"product-card:{product.id}", ttl=300)[product_card(product)]
+
+    The key must identify everything the subtree depends on. On a miss the
+    subtree is rendered like the rest of the tree while its HTML is collected
+    and stored when it has been rendered completely. Pass a callable to only build the subtree on a
+    miss. ttl is in seconds, None keeps the fragment until it is evicted.
+    """
+    if ttl is not None and ttl <= 0:
+        raise ValueError(f"ttl must be positive or None, got {ttl!r}")
+    return _CachedFragment(key, ttl, backend, None)
+
+
+class _CachedFragment:
+    __slots__ = ("key", "ttl", "backend", "node")
+
+    def __init__(
+        self, key: str, ttl: float | None, backend: LRUCache | CacheAdapter | None, node: Node
+    ) -> None:
+        self.key = key
+        self.ttl = ttl
+        self.backend = backend
+        self.node = node
+
+    def __getitem__(self, node: Node) -> _CachedFragment:
+        if _validate_children_on_build:
+            _validate_children(node)
+        return _CachedFragment(self.key, self.ttl, self.backend, node)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> _Markup:
+        return render_node(self)
+
+    def __repr__(self) -> str:
+        return f"<cache {self.key!r}>"
+
+    # Rendered by the render loops, so that the fragment is rendered like the
+    # rest of the tree (asynchronously, in an executor, etc).
+    def get(self) -> str | None:
+        return (self.backend or _fragment_cache).get(self.key)
+
+    def store(self, html: str) -> None:
+        (self.backend or _fragment_cache).set(self.key, html, self.ttl)
+
+
+class _Fragment(tuple[t.Any, ...]):
+    """Sibling nodes, like a tuple, that can also be converted to a str."""
+
+    __slots__ = ()
+
+    def __str__(self) -> _Markup:
+        return render_node(self)
+
+
+class _TraceAbort(Exception):
+    pass
+
+
+class _Placeholder:
+    """Stands in for an argument while a compiled component is traced.
+
+    Rendered as a child, it becomes a marker for a node slot. Used as an
+    attribute value, it becomes a marker for a text slot (see _force_escape).
+    Anything else that could change the output, like converting it to a str,
+    formatting it, branching on the value or accessing its attributes, aborts
+    the trace.
+    """
+
+    __slots__ = ("_node_marker", "_text_marker")
+    __hash__ = None  # type: ignore[assignment]
+
+    def __init__(self, token: str, index: int) -> None:
+        self._node_marker = f"\x00{token}n{index}\x00"
+        self._text_marker = f"\x00{token}t{index}\x00"
+
+    def __html__(self) -> str:
+        return self._node_marker
+
+    def __str__(self) -> str:
+        # String methods, slices and markup built from the str would be
+        # recorded instead of the value.
+        raise _TraceAbort
+
+    def __format__(self, format_spec: str) -> str:
+        raise _TraceAbort
+
+    def __repr__(self) -> str:
+        raise _TraceAbort
+
+    def __bool__(self) -> bool:
+        raise _TraceAbort
+
+    def __eq__(self, other: t.Any) -> bool:
+        raise _TraceAbort
+
+    def __ne__(self, other: t.Any) -> bool:
+        raise _TraceAbort
+
+    def __getattr__(self, name: str) -> t.Any:
+        raise _TraceAbort
+
+
+# Provided at the root of a trace so that context consumers abort it.
+_TRACING_CONTEXT: Context[None] = Context("htpy.compiled")
+
+
+class _CompiledVariant:
+    """The output of a traced component: static HTML with slots in between.
+
+    slots holds (static HTML before the slot, argument index, is a node slot)
+    and tail is the static HTML after the last slot.
+    """
+
+    __slots__ = ("slots", "tail", "verified")
+
+    def __init__(self, slots: list[tuple[str, int, bool]], tail: str) -> None:
+        self.slots = slots
+        self.tail = tail
+        self.verified = False
+
+    def fill(self, values: tuple[t.Any, ...]) -> Node:
+        nodes: list[t.Any] = []
+        chunk: list[str] = []
+        for static, index, is_node in self.slots:
+            chunk.append(static)
+            value = values[index]
+            if type(value) in (str, int):
+                # Renders the same in text and node slots.
+                chunk.append(_force_escape(value))
+            elif not is_node:
+                # Let the component decide how to render (or reject) other
+                # attribute values.
+                return None
+            elif type(value) is _Markup:
+                chunk.append(value)
+            else:
+                nodes.append(_Markup("".join(chunk)))
+                nodes.append(value)
+                chunk = []
+        chunk.append(self.tail)
+        if not nodes:
+            return _Markup("".join(chunk))
+        nodes.append(_Markup("".join(chunk)))
+        return _Fragment(nodes)
+
+
+def _trace(
+    func: Callable[..., Node], params: list[inspect.Parameter], key: tuple[t.Any, ...]
+) -> _CompiledVariant | None:
+    token = secrets.token_hex(8)
+    args: list[t.Any] = []
+    kwargs: dict[str, t.Any] = {}
+    for index, (param, value) in enumerate(zip(params, key, strict=True)):
+        if value is not None and value is not True and value is not False:
+            # The type of the argument.
+            value = _Placeholder(token, index)
+        if param.kind is param.KEYWORD_ONLY:
+            kwargs[param.name] = value
+        else:
+            args.append(value)
+
+    try:
+        html = _render_node_context(
+            func(*args, **kwargs), _ProvidedContext(_TRACING_CONTEXT, None, None)
+        )
+    except Exception:
+        return None
+
+    pieces = re.split(f"\x00{token}([nt])([0-9]+)\x00", html)
+    if any(token in piece for piece in pieces[::3]):
+        # A marker was taken apart.
+        return None
+
+    slots = [
+        (pieces[i], int(pieces[i + 2]), pieces[i + 1] == "n") for i in range(0, len(pieces) - 1, 3)
+    ]
+    return _CompiledVariant(slots, pieces[-1])
+
+
+_VERIFIABLE_TYPES = frozenset({str, int, bool, type(None), _Markup})
+
+
+def _is_verifiable(value: t.Any) -> bool:
+    # Values that render the same when they are rendered twice: plain values
+    # and static elements (see BaseElement.__init__).
+    if type(value) in _VERIFIABLE_TYPES:
+        return True
+    return isinstance(value, BaseElement) and value._rendered is not False  # pyright: ignore [reportPrivateUsage]
+
+
+def compiled(func: Callable[P, Node]) -> Callable[P, Node]:
+    """Compile a component to static HTML with slots for its arguments.
+
+    The component is called once with placeholder arguments and the output is
+    recorded. Later calls fill in the arguments and return Markup (or sibling
+    nodes when an argument is an element or another node that must be
+    rendered in place).
+
+    Arguments that are None, True or False are passed as is, and one variant
+    is compiled for each combination of them and of the types of the other
+    arguments. Other arguments can be used as children and attribute values.
+    Components that use them in other ways, for instance to branch on them,
+    loop over them, format them or consume a context, are not compiled and are
+    called as usual. The component must be a pure function of its arguments.
+    """
+    signature = inspect.signature(func)
+    params = list(signature.parameters.values())
+    if any(param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD) for param in params):
+        return func
+
+    all_positional = all(
+        param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD) for param in params
+    )
+    variants: dict[tuple[t.Any, ...], _CompiledVariant | None] = {}
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> Node:
+        values: tuple[t.Any, ...]
+        if all_positional and not kwargs and len(args) == len(params):
+            values = args
+        else:
+            try:
+                bound = signature.bind(*args, **kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            bound.apply_defaults()
+            values = tuple(bound.arguments.values())
+
+        # Components may branch on the type of an argument, which the trace
+        # cannot see: every combination of types is traced and verified
+        # separately.
+        key = tuple(
+            value
+            if value is None or value is True or value is False
+            else t.cast("t.Any", type(value))
+            for value in values
+        )
+        try:
+            variant = variants[key]
+        except KeyError:
+            variant = variants[key] = _trace(func, params, key)
+
+        if variant is None:
+            return func(*args, **kwargs)
+
+        if variant.verified:
+            result = variant.fill(values)
+            return func(*args, **kwargs) if result is None else result
+
+        # Check the first compiled output against the component before using
+        # it. Only done for arguments that can be rendered twice.
+        if not all(_is_verifiable(value) for value in values):
+            return func(*args, **kwargs)
+        expected = render_node(func(*args, **kwargs))
+        filled = variant.fill(values)
+        if filled is not None and render_node(filled) == expected:
+            variant.verified = True
+        else:
+            variants[key] = None
+        return expected
+
+    return wrapper
+
+
 @t.runtime_checkable
 class _HasHtml(t.Protocol):
     def __html__(self) -> str: ...
@@ -344,9 +2498,13 @@ Node: t.TypeAlias = (
     | BaseElement
     | _HasHtml
     | Iterable["Node"]
+    | AsyncIterable["Node"]
+    | Awaitable["Node"]
     | Callable[[], "Node"]
     | ContextProvider[t.Any]
+    | LazyContextProvider[t.Any]
     | ContextConsumer[t.Any]
+    | _Deferred
 )
 
 Attribute: t.TypeAlias = None | bool | str | int | _HasHtml | _ClassNames
@@ -477,14 +2635,139 @@ var = Element("var")
 
 _KnownInvalidChildren: UnionType = bytes | bytearray | memoryview
 
-_KnownValidChildren: UnionType = (  # pyright: ignore [reportUnknownVariableType]
-    None
-    | BaseElement
-    | ContextProvider  # pyright: ignore [reportMissingTypeArgument]
-    | ContextConsumer  # pyright: ignore [reportMissingTypeArgument]
-    | Callable  # pyright: ignore [reportMissingTypeArgument]
-    | str
-    | int
-    | Generator  # pyright: ignore [reportMissingTypeArgument]
-    | _HasHtml
-)
+# Node kinds, resolved once per concrete type by _node_kinds below. The
+# render loops and child validation dispatch on these instead of running a
+# chain of isinstance() checks (including the slow runtime checkable
+# protocol check for _HasHtml) for every node.
+_IGNORE = 0
+_CALLABLE = 1
+_TEXT = 2
+_INT = 3
+_ELEMENT = 4
+_HTML_ELEMENT = 5
+_VOID_ELEMENT = 6
+_CUSTOM_ELEMENT = 7
+_CONTEXT_PROVIDER = 8
+_CONTEXT_CONSUMER = 9
+_ITERABLE = 10
+_INVALID = 11
+_HTML = 12
+_AWAITABLE = 13
+_ASYNC_ITERABLE = 14
+_DEFERRED = 15
+_OFFLOADED = 16
+_DYNAMIC = 17
+_CACHED = 18
+_CUSTOM_CONTAINER = 19
+
+
+def _resolve_node_kind(cls: type[t.Any]) -> int:
+    # The order of these checks defines how a node is rendered and must match
+    # the order the nodes were historically checked in: callables are called
+    # (unless they are elements), __html__ takes precedence over iteration, etc.
+    if issubclass(cls, BaseElement):
+        iter_context = cls._iter_context  # pyright: ignore [reportPrivateUsage]
+        if iter_context is BaseElement._iter_context:  # pyright: ignore [reportPrivateUsage]
+            return _ELEMENT
+        if iter_context is HTMLElement._iter_context:  # pyright: ignore [reportPrivateUsage]
+            return _HTML_ELEMENT
+        if iter_context is VoidElement._iter_context:  # pyright: ignore [reportPrivateUsage]
+            return _VOID_ELEMENT
+        return _CUSTOM_ELEMENT
+
+    if hasattr(cls, "_iter_walk"):  # pyright: ignore [reportUnknownArgumentType]
+        # Other nodes that render themselves and contain nodes, like
+        # htpy.arena.Arena. _iter_walk(ctx, walk) renders the contained nodes
+        # with walk(node, ctx), so that they are rendered like the rest of the
+        # tree (asynchronously, in an executor, etc).
+        return _CUSTOM_CONTAINER
+
+    if hasattr(cls, "_iter_context"):  # pyright: ignore [reportUnknownArgumentType]
+        # Other nodes that render themselves.
+        return _CUSTOM_ELEMENT
+
+    if issubclass(cls, Callable):  # type: ignore[arg-type]
+        return _CALLABLE
+
+    if cls is type(None) or cls is bool:
+        return _IGNORE
+
+    if issubclass(cls, ContextProvider | LazyContextProvider):
+        return _CONTEXT_PROVIDER
+
+    if issubclass(cls, ContextConsumer):
+        return _CONTEXT_CONSUMER
+
+    if issubclass(cls, _Deferred):
+        return _DEFERRED
+
+    if issubclass(cls, _Offloaded):
+        return _OFFLOADED
+
+    if issubclass(cls, _CachedFragment):
+        return _CACHED
+
+    # Before Iterable: asyncio.Future is both awaitable and iterable.
+    if issubclass(cls, Awaitable):
+        return _AWAITABLE
+
+    if issubclass(cls, AsyncIterable):
+        return _ASYNC_ITERABLE
+
+    if not issubclass(cls, _HasHtml) and (
+        hasattr(cls, "__getattr__")
+        or any(inspect.isfunction(vars(base).get("__getattribute__")) for base in cls.__mro__)
+    ):
+        # Proxies, like Django's SimpleLazyObject, may provide __html__ for
+        # some objects only, see _dynamic_node().
+        return _DYNAMIC
+
+    return _resolve_value_kind(cls)
+
+
+def _resolve_value_kind(cls: type[t.Any]) -> int:
+    if issubclass(cls, _HasHtml):
+        return _HTML
+
+    if issubclass(cls, str):
+        return _TEXT
+
+    if issubclass(cls, int):
+        return _INT
+
+    if issubclass(cls, Iterable) and not issubclass(cls, _KnownInvalidChildren):
+        return _ITERABLE
+
+    return _INVALID
+
+
+def _dynamic_node_kind(x: t.Any) -> int:
+    # The kind of a _DYNAMIC node, checked with the object like all nodes were
+    # before the kind table.
+    if isinstance(x, _HasHtml):
+        return _HTML
+    return _resolve_value_kind(type(x))  # pyright: ignore [reportUnknownArgumentType]
+
+
+def _dynamic_node(x: t.Any) -> t.Any:
+    # Returns a node to render in place of a _DYNAMIC node, or x if it is not
+    # valid.
+    kind = _dynamic_node_kind(x)
+    if kind is _HTML:
+        return _Markup(x.__html__())
+    if kind is _TEXT:
+        return str(x)
+    if kind is _INT:
+        return _Markup(str(x))
+    if kind is _ITERABLE:
+        return iter(x)
+    return x
+
+
+class _NodeKinds(dict[type, int]):
+    def __missing__(self, cls: type) -> int:
+        kind = self[cls] = _resolve_node_kind(cls)
+        return kind
+
+
+_node_kinds = _NodeKinds()
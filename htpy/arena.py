@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import typing as t
+from array import array
+
+from markupsafe import Markup
+
+from . import (
+    _call_attrs_string,  # pyright: ignore [reportPrivateUsage]
+    _force_escape,  # pyright: ignore [reportPrivateUsage]
+    _iter_node_context,  # pyright: ignore [reportPrivateUsage]
+    _render_node_context,  # pyright: ignore [reportPrivateUsage]
+    iter_node,
+)
+
+if t.TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from . import Attribute, Node, _ProvidedContext  # pyright: ignore [reportPrivateUsage]
+
+__all__ = ["Arena"]
+
+# https://developer.mozilla.org/en-US/docs/Glossary/Void_element
+_VOID_TAGS = frozenset(
+    {
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "param",
+        "source",
+        "track",
+        "wbr",
+    }
+)
+
+# Node kinds
+_ELEMENT = 0  # Element with children up to _ends[index]
+_LEAF = 1  # Element or void element without children or with a single text child
+_TEXT = 2  # Escaped text
+_NODE = 3  # Any other htpy node, rendered as usual
+
+
+class Arena:
+    """A compact tree for very large pages that are built up front.
+
+    Instead of one object per element, the nodes are kept in flat arrays: tag
+    names and attribute strings are interned and stored as ids, text is escaped
+    when it is added and the children of an element are the nodes up to the end
+    of its range. Elements are opened and closed in document order:
+
+        tree = Arena()
+        tree.open("table")
+        for row in rows:
+            tree.open("tr")
+            tree.leaf("td", str(row), class_="cell")
+            tree.close()
+        tree.close()
+
+    An arena renders like any other node and can be used as a child.
+    """
+
+    def __init__(self) -> None:
+        self._tags: list[str] = []
+        self._tag_ids: dict[str, int] = {}
+        self._attrs: list[str] = [""]
+        self._attr_ids: dict[str, int] = {"": 0}
+        self._texts: list[str] = [""]
+        self._nodes: list[Node] = []
+
+        self._kinds = array("B")
+        self._values = array("I")  # tag id, text index or node index
+        self._attr_of = array("I")
+        self._texts_of = array("I")  # text index of leaves
+        self._ends = array("I")
+
+        self._open: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._kinds)
+
+    def _add(self, kind: int, value: int, attrs: int = 0, text: int = 0) -> None:
+        self._kinds.append(kind)
+        self._values.append(value)
+        self._attr_of.append(attrs)
+        self._texts_of.append(text)
+        self._ends.append(0)
+
+    def _tag_id(self, tag: str) -> int:
+        try:
+            return self._tag_ids[tag]
+        except KeyError:
+            tag_id = self._tag_ids[tag] = len(self._tags)
+            self._tags.append(tag)
+            return tag_id
+
+    def _attr_id(
+        self, id_class: str, attrs: dict[str, Attribute] | None, kwargs: dict[str, Attribute]
+    ) -> int:
+        if not id_class and not attrs and not kwargs:
+            return 0
+        attrs_str = _call_attrs_string(id_class, attrs or {}, kwargs)
+        try:
+            return self._attr_ids[attrs_str]
+        except KeyError:
+            attr_id = self._attr_ids[attrs_str] = len(self._attrs)
+            self._attrs.append(attrs_str)
+            return attr_id
+
+    def open(
+        self,
+        tag: str,
+        id_class: str = "",
+        attrs: dict[str, Attribute] | None = None,
+        **kwargs: Attribute,
+    ) -> None:
+        """Open an element. Nodes added until the matching close() are its children.
+
+        Attributes are given like when calling an element: tree.open("div",
+        "#main.content", {"data-x": "1"}, hidden=True).
+        """
+        if tag in _VOID_TAGS:
+            raise ValueError(f"<{tag}> is a void element and cannot have children, use leaf()")
+        self._open.append(len(self._kinds))
+        self._add(_ELEMENT, self._tag_id(tag), self._attr_id(id_class, attrs, kwargs))
+
+    def close(self) -> None:
+        """Close the element that was opened last."""
+        try:
+            index = self._open.pop()
+        except IndexError:
+            raise ValueError("there is no open element to close") from None
+        self._ends[index] = len(self._kinds)
+
+    def leaf(
+        self,
+        tag: str,
+        text: str | int | None = None,
+        id_class: str = "",
+        attrs: dict[str, Attribute] | None = None,
+        **kwargs: Attribute,
+    ) -> None:
+        """Add an element without children or with a single text child, like a table cell."""
+        if text is not None and tag in _VOID_TAGS:
+            raise ValueError(f"<{tag}> is a void element and cannot have children")
+        self._add(
+            _LEAF,
+            self._tag_id(tag),
+            self._attr_id(id_class, attrs, kwargs),
+            self._text_index(text),
+        )
+
+    def text(self, text: str | int) -> None:
+        """Add text, it is escaped unless it is Markup."""
+        self._add(_TEXT, self._text_index(text))
+
+    def node(self, node: Node) -> None:
+        """Add any other node, like an element or a context consumer."""
+        self._add(_NODE, len(self._nodes))
+        self._nodes.append(node)
+
+    def _text_index(self, text: str | int | None) -> int:
+        if text is None or text == "":
+            return 0
+        self._texts.append(str(text) if isinstance(text, Markup) else _force_escape(text))
+        return len(self._texts) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        return iter_node(self)
+
+    def __str__(self) -> Markup:
+        return Markup(_render_node_context(self, None))
+
+    def encode(self, encoding: str = "utf-8", errors: str = "strict") -> bytes:
+        return _render_node_context(self, None).encode(encoding, errors)
+
+    def __repr__(self) -> str:
+        return f"<Arena with {len(self)} nodes>"
+
+    def _iter_context(self, ctx: _ProvidedContext | None) -> Iterator[str]:
+        return self._iter_walk(ctx, _iter_node_context)
+
+    def _iter_walk(
+        self,
+        ctx: _ProvidedContext | None,
+        walk: Callable[[Node, _ProvidedContext | None], Iterator[str]],
+    ) -> Iterator[str]:
+        # walk renders the nodes added with node() in the render mode of the
+        # tree, for instance asynchronously with aiter_node().
+        if self._open:
+            tag = self._tags[self._values[self._open[-1]]]
+            raise ValueError(f"<{tag}> was opened but never closed")
+
+        tags = self._tags
+        end_tags = [f"</{tag}>" if tag not in _VOID_TAGS else "" for tag in tags]
+        attrs = self._attrs
+        texts = self._texts
+        kinds = self._kinds
+        values = self._values
+        attr_of = self._attr_of
+        texts_of = self._texts_of
+        ends = self._ends
+
+        # (end of the element's range, end tag) for each open element.
+        closing: list[tuple[int, str]] = []
+        next_end = -1
+        for index in range(len(kinds)):
+            while index == next_end:
+                yield closing.pop()[1]
+                next_end = closing[-1][0] if closing else -1
+
+            kind = kinds[index]
+            if kind == _LEAF:
+                tag_id = values[index]
+                text = texts[texts_of[index]]
+                yield f"<{tags[tag_id]}{attrs[attr_of[index]]}>{text}{end_tags[tag_id]}"
+            elif kind == _ELEMENT:
+                tag_id = values[index]
+                yield f"<{tags[tag_id]}{attrs[attr_of[index]]}>"
+                next_end = ends[index]
+                closing.append((next_end, end_tags[tag_id]))
+            elif kind == _TEXT:
+                yield texts[values[index]]
+            else:
+                yield from walk(self._nodes[values[index]], ctx)
+
+        while closing:
+            yield closing.pop()[1]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import queue
+import typing as t
+
+from . import (
+    _render_node_context,  # pyright: ignore [reportPrivateUsage]
+    iter_node,
+)
+
+if t.TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from . import Node
+
+__all__ = ["Broadcast", "format_event", "iter_event"]
+
+
+def format_event(
+    node: Node,
+    *,
+    event: str | None = None,
+    id: str | None = None,
+    retry: int | None = None,
+) -> str:
+    """Render node as a server-sent event.
+
+    Every line of the rendered HTML becomes a data: line. event, id and retry
+    are added as fields when they are given.
+    """
+    html = _render_node_context(node, None)
+    return f"{_fields(event, id, retry)}data: {_data_lines(html)}\n\n"
+
+
+def iter_event(
+    node: Node,
+    *,
+    event: str | None = None,
+    id: str | None = None,
+    retry: int | None = None,
+) -> Iterator[str]:
+    """Like format_event(), but the event is streamed while node is rendered."""
+    yield f"{_fields(event, id, retry)}data: "
+    after_cr = False
+    for chunk in iter_node(node):
+        if after_cr and chunk.startswith("\n"):
+            # The \r\n was split between two chunks and the line already ended.
+            chunk = chunk[1:]
+        if not chunk:
+            continue
+        after_cr = chunk.endswith("\r")
+        yield _data_lines(chunk)
+    yield "\n\n"
+
+
+def _fields(event: str | None, id: str | None, retry: int | None) -> str:
+    fields = ""
+    if event is not None:
+        _check_field("event", event)
+        fields += f"event: {event}\n"
+    if id is not None:
+        _check_field("id", id)
+        fields += f"id: {id}\n"
+    if retry is not None:
+        fields += f"retry: {int(retry)}\n"
+    return fields
+
+
+def _check_field(name: str, value: str) -> None:
+    if "\n" in value or "\r" in value or "\0" in value:
+        raise ValueError(f"{name} must not contain line breaks or NUL, got {value!r}")
+
+
+def _data_lines(html: str) -> str:
+    # \r\n, \r and \n all end a line in an event stream.
+    if "\r" in html:
+        html = html.replace("\r\n", "\n").replace("\r", "\n")
+    return html.replace("\n", "\ndata: ")
+
+
+class _Subscriber(t.Protocol):
+    def put_nowait(self, item: bytes, /) -> None: ...
+
+
+class Broadcast:
+    """Send the same event to many subscribers, rendering it only once.
+
+    Subscribers are queues, like asyncio.Queue or queue.Queue, that each
+    connection reads its events from. publish() renders and encodes the event
+    once and puts the same bytes object in every queue, so the cost of an
+    update does not grow with the number of subscribers. An event is dropped
+    for subscribers whose queue is full.
+
+        updates = Broadcast()
+
+        async def order_book_events(request):
+            events = asyncio.Queue(maxsize=100)
+            updates.subscribe(events)
+            try:
+                while True:
+                    yield await events.get()
+            finally:
+                updates.unsubscribe(events)
+
+        updates.publish(order_row(order), event="order-update")
+
+    asyncio queues are not thread safe: publish to them from their event loop.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: set[_Subscriber] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def publish(
+        self,
+        node: Node,
+        *,
+        event: str | None = None,
+        id: str | None = None,
+        retry: int | None = None,
+    ) -> int:
+        """Send node as an event to all subscribers.
+
+        Returns the number of subscribers the event was put in the queue for.
+        """
+        import asyncio
+
+        frame = format_event(node, event=event, id=id, retry=retry).encode()
+        sent = 0
+        for subscriber in tuple(self._subscribers):
+            try:
+                subscriber.put_nowait(frame)
+            except (asyncio.QueueFull, queue.Full):
+                continue
+            sent += 1
+        return sent
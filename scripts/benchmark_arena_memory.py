@@ -0,0 +1,51 @@
+"""
+Compare the peak memory of building the table from benchmark_big_table.py up
+front as elements and as an htpy.arena.Arena, and the time to render them.
+"""
+
+import time
+import tracemalloc
+
+from htpy import Node, render_node, table, tbody, td, th, thead, tr
+from htpy.arena import Arena
+
+ROWS = 200_000
+
+
+def element_table(rows: list[int]) -> Node:
+    return table[thead[tr[th["Row #"]]], tbody[[tr[td[str(row)]] for row in rows]]]
+
+
+def arena_table(rows: list[int]) -> Node:
+    tree = Arena()
+    tree.open("table")
+    tree.open("thead")
+    tree.open("tr")
+    tree.leaf("th", "Row #")
+    tree.close()
+    tree.close()
+    tree.open("tbody")
+    for row in rows:
+        tree.open("tr")
+        tree.leaf("td", str(row))
+        tree.close()
+    tree.close()
+    tree.close()
+    return tree
+
+
+rows = list(range(ROWS))
+outputs: list[str] = []
+
+for name, build in [("elements", element_table), ("arena", arena_table)]:
+    tracemalloc.start()
+    node = build(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    outputs.append(render_node(node))
+    elapsed = time.perf_counter() - start
+    print(f"{name}: built with a peak of {peak / 1e6:.1f} MB, rendered in {elapsed:.3f}s")
+
+assert outputs[0] == outputs[1]
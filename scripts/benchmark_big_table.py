@@ -1,5 +1,7 @@
 import tempfile
 import time
+import typing as t
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 import django
@@ -7,12 +9,65 @@ from django.conf import settings
 from django.template import Context
 from django.template import Template as DjangoTemplate
 from jinja2 import Template as JinjaTemplate
+from markupsafe import escape
 
-from htpy import table, tbody, td, th, thead, tr
+from htpy import (
+    BaseElement,
+    ContextConsumer,
+    ContextProvider,
+    HTMLElement,
+    VoidElement,
+    table,
+    tbody,
+    td,
+    th,
+    thead,
+    tr,
+)
 
 settings.configure(TEMPLATES=[{"BACKEND": "django.template.backends.django.DjangoTemplates"}])
 django.setup()
 
+
+def iter_node_recursive(x: t.Any, context_dict: dict[t.Any, t.Any]) -> Iterator[str]:
+    """The previous render engine: one nested generator per element level.
+
+    Kept here as a reference to compare the explicit stack engine against.
+    """
+    while not isinstance(x, BaseElement) and callable(x):
+        x = x()
+
+    if x is None or x is True or x is False:
+        return
+
+    if isinstance(x, BaseElement):
+        if isinstance(x, HTMLElement):
+            yield "<!doctype html>"
+        yield f"<{x._name}{x._attrs}>"
+        if not isinstance(x, VoidElement):
+            yield from iter_node_recursive(x._children, context_dict)
+            yield f"</{x._name}>"
+    elif isinstance(x, ContextProvider):
+        yield from iter_node_recursive(x.func(), {**context_dict, x.context: x.value})
+    elif isinstance(x, ContextConsumer):
+        yield from iter_node_recursive(
+            x.func(context_dict.get(x.context, x.context.default)), context_dict
+        )
+    elif isinstance(x, str) or hasattr(x, "__html__"):
+        yield str(escape(x))
+    elif isinstance(x, int):
+        yield str(x)
+    elif isinstance(x, Iterable):
+        for child in x:
+            yield from iter_node_recursive(child, context_dict)
+    else:
+        raise ValueError(f"{x!r} is not a valid child element")
+
+
+def big_table(rows: list[int]) -> BaseElement:
+    return table[thead[tr[th["Row #"]]], tbody[(tr[td[str(row)]] for row in rows)]]
+
+
 django_jinja_template = """
 <table>
     <thead><tr><th>Row #</th></tr></thead>
@@ -26,9 +81,10 @@ django_jinja_template = """
 
 
 tests = [
+    ("htpy", lambda rows: str(big_table(rows))),
     (
-        "htpy",
-        lambda rows: str(table[thead[tr[th["Row #"]]], tbody[(tr[td[str(row)]] for row in rows)]]),
+        "htpy (recursive engine)",
+        lambda rows: "".join(iter_node_recursive(big_table(rows), {})),
     ),
     (
         "django",
@@ -43,6 +99,6 @@ for name, func in tests:
     start = time.perf_counter()
     output = func(rows)
     result = time.perf_counter() - start
-    out_path = tmp / f"{name}_table.html"
+    out_path = tmp / f"{name.replace(' ', '_')}_table.html"
     out_path.write_text(output)
     print(f"{name}: {result} seconds - {out_path}")
@@ -0,0 +1,31 @@
+"""
+Compare the CPU cost and size of the big table from benchmark_big_table.py when
+it is streamed uncompressed and with iter_gzip() at different levels.
+"""
+
+import time
+
+from htpy import Element, iter_bytes, iter_gzip, table, tbody, td, th, thead, tr
+
+ROWS = 50_000
+
+
+def big_table(rows: list[int]) -> Element:
+    return table[thead[tr[th["Row #"]]], tbody[(tr[td[str(row)]] for row in rows)]]
+
+
+rows = list(range(ROWS))
+
+start = time.perf_counter()
+size = sum(len(chunk) for chunk in iter_bytes(big_table(rows)))
+baseline = time.perf_counter() - start
+print(f"{'uncompressed':<14}{baseline:>8.3f}s{size / 1024:>10.0f} KiB")
+
+for level in [1, 3, 6, 9]:
+    start = time.perf_counter()
+    compressed = sum(len(chunk) for chunk in iter_gzip(big_table(rows), level))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{f'gzip level {level}':<14}{elapsed:>8.3f}s{compressed / 1024:>10.0f} KiB"
+        f"  (+{elapsed - baseline:.3f}s, {compressed / size:.1%} of the size)"
+    )
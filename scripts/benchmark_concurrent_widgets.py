@@ -0,0 +1,35 @@
+"""
+Render a dashboard with six widgets that each wait for a different service with
+aiter_node() at different concurrency limits. With concurrency=1 the page takes
+the sum of the latencies, without a limit it takes as long as the slowest one.
+"""
+
+import asyncio
+import time
+
+from htpy import Node, aiter_node, div, h2, main, section
+
+LATENCIES = [0.05, 0.08, 0.12, 0.03, 0.1, 0.07]
+
+
+async def widget(index: int, latency: float) -> Node:
+    await asyncio.sleep(latency)
+    return section[h2[f"Widget {index}"], div[f"Loaded in {latency * 1000:.0f} ms"]]
+
+
+def dashboard() -> Node:
+    return main[[widget(index, latency) for index, latency in enumerate(LATENCIES)]]
+
+
+async def render(concurrency: int | None) -> float:
+    start = time.perf_counter()
+    async for _ in aiter_node(dashboard(), concurrency=concurrency):
+        pass
+    return time.perf_counter() - start
+
+
+for concurrency in [1, 2, 3, None]:
+    elapsed = asyncio.run(render(concurrency))
+    print(f"concurrency={concurrency!s:<5}{elapsed * 1000:>8.0f} ms")
+
+print(f"sum of latencies {sum(LATENCIES) * 1000:>6.0f} ms, slowest {max(LATENCIES) * 1000:.0f} ms")
@@ -0,0 +1,40 @@
+"""
+Measure rendering with deeply nested context providers.
+
+Each row of a table is wrapped in `depth` nested providers for different
+contexts, and every cell consumes the outermost one. Providing a context is
+O(1), so the render time should grow linearly with the number of providers,
+not with depth * number of active contexts.
+"""
+
+import time
+
+from htpy import Context, Node, table, td, tr
+
+ROWS = 2_000
+
+
+def make_contexts(depth: int) -> list[Context[int]]:
+    return [Context(f"ctx{i}") for i in range(depth)]
+
+
+def row(contexts: list[Context[int]], number: int) -> Node:
+    @contexts[0].consumer
+    def cell(value: int) -> Node:
+        return td[value]
+
+    node: Node = tr[cell()]
+    for context in reversed(contexts):
+        node = context.provider(number, lambda node=node: node)  # type: ignore[misc]
+    return node
+
+
+for depth in (1, 6, 25, 100):
+    contexts = make_contexts(depth)
+    page = table[[row(contexts, number) for number in range(ROWS)]]
+
+    start = time.perf_counter()
+    str(page)
+    elapsed = time.perf_counter() - start
+    per_provider = elapsed / (ROWS * depth) * 1e9
+    print(f"depth {depth:>3}: {elapsed:.4f} seconds ({per_provider:.0f} ns per provider)")
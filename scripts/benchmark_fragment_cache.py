@@ -0,0 +1,64 @@
+"""
+Render a product listing page with 48 product cards, with and without cache().
+Cached cards are looked up by product id and version, so only the first page
+renders them. The cards are built inside a callable, so a hit skips building
+them too.
+"""
+
+import dataclasses
+import functools
+import time
+
+from htpy import LRUCache, Node, a, article, cache, div, h3, img, li, main, p, span, ul
+
+PAGES = 500
+
+
+@dataclasses.dataclass
+class Product:
+    id: int
+    version: int
+    name: str
+    price: float
+    tags: list[str]
+
+
+PRODUCTS = [Product(i, 1, f"Product {i}", 10 + i / 4, ["new", "sale"]) for i in range(48)]
+
+
+def product_card(product: Product) -> Node:
+    return article(".card", data_id=str(product.id))[
+        img(src=f"/img/{product.id}.jpg", alt=product.name, loading="lazy"),
+        h3[a(href=f"/products/{product.id}")[product.name]],
+        p(".price")[f"{product.price:.2f} €"],
+        ul(".tags")[(li[span(".tag")[tag]] for tag in product.tags)],
+        div(".actions")[a(".button", href=f"/cart/add/{product.id}")["Add to cart"]],
+    ]
+
+
+def page(cached: bool, backend: LRUCache) -> Node:
+    if not cached:
+        return main[ul[(li[product_card(product)] for product in PRODUCTS)]]
+    return main[
+        ul[
+            (
+                li[
+                    cache(f"card:{product.id}:{product.version}", backend=backend)[
+                        functools.partial(product_card, product)
+                    ]
+                ]
+                for product in PRODUCTS
+            )
+        ]
+    ]
+
+
+for name, cached in [("uncached", False), ("cache()", True)]:
+    backend = LRUCache()
+    start = time.perf_counter()
+    for _ in range(PAGES):
+        str(page(cached, backend))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10}{elapsed / PAGES * 1000:>8.3f} ms/page")
+    if cached:
+        print(backend.cache_info())
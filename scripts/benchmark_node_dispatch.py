@@ -0,0 +1,59 @@
+"""
+Measure the per-node cost of classifying and rendering children.
+
+Compares the isinstance() chain that was previously used for every node with
+the per-type dispatch table, and shows the cost of rendering a node of each
+kind.
+"""
+
+import timeit
+import typing as t
+from collections.abc import Iterable
+
+from markupsafe import Markup
+
+from htpy import BaseElement, ContextConsumer, ContextProvider, _HasHtml, _node_kinds, div, span
+
+N = 100_000
+
+nodes: dict[str, t.Any] = {
+    "str": "hello",
+    "int": 42,
+    "Markup": Markup("<b>hi</b>"),
+    "element": span["x"],
+    "list": ["a", "b"],
+}
+
+
+def isinstance_chain(x: t.Any) -> str:
+    if not isinstance(x, BaseElement) and callable(x):
+        return "callable"
+    if x is None or x is True or x is False:
+        return "ignore"
+    if isinstance(x, BaseElement):
+        return "element"
+    if isinstance(x, ContextProvider):
+        return "provider"
+    if isinstance(x, ContextConsumer):
+        return "consumer"
+    if isinstance(x, str | _HasHtml):
+        return "text"
+    if isinstance(x, int):
+        return "int"
+    if isinstance(x, Iterable):
+        return "iterable"
+    return "invalid"
+
+
+def ns_per_node(func: t.Callable[[], object], count: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=5)) / count * 1e9
+
+
+print(f"{'node':<10}{'isinstance chain':>20}{'dispatch table':>20}{'render':>20}")
+for name, node in nodes.items():
+    items = [node] * N
+    chain = ns_per_node(lambda: [isinstance_chain(x) for x in items], N)  # noqa: B023
+    table = ns_per_node(lambda: [_node_kinds[type(x)] for x in items], N)  # noqa: B023
+    element = div[items]
+    render = ns_per_node(lambda: str(element), N)  # noqa: B023
+    print(f"{name:<10}{chain:>17.1f} ns{table:>17.1f} ns{render:>17.1f} ns")
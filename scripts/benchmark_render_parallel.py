@@ -0,0 +1,36 @@
+"""
+Render a big table with render_parallel() using different numbers of processes
+and compare it with rendering it in the current process.
+"""
+
+import os
+import time
+
+from htpy import Node, iter_bytes, render_parallel, table, tbody, td, tr
+
+ROWS = 500_000
+
+
+def row(number: int) -> Node:
+    return tr[td[number], td(".name")[f"Row {number}"], td(".total")[f"{number * 1.5:.2f}"]]
+
+
+def render(node: Node) -> float:
+    start = time.perf_counter()
+    for _ in iter_bytes(node):
+        pass
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = range(ROWS)
+    baseline = render(table[tbody[(row(number) for number in rows)]])
+    print(f"{'in process':<14}{baseline:>8.3f}s")
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        elapsed = render(
+            table[tbody[render_parallel(rows, row, processes=processes, shard_size=2000)]]
+        )
+        print(f"{f'{processes} processes':<14}{elapsed:>8.3f}s  {baseline / elapsed:.2f}x")
+        processes *= 2
@@ -0,0 +1,53 @@
+"""
+Send an updated order book row to a growing number of subscribers, formatting
+the event for each subscriber versus once with Broadcast.publish(). With
+Broadcast the time per update stays about the same as subscribers are added.
+"""
+
+import queue
+import time
+
+from htpy import Node, td, tr
+from htpy.sse import Broadcast, format_event
+
+UPDATES = 100
+
+
+def order_row(price: float, quantity: int) -> Node:
+    return tr(".order", data_price=str(price))[
+        td(".price")[f"{price:.2f}"],
+        td(".quantity")[quantity],
+        td(".total")[f"{price * quantity:.2f}"],
+    ]
+
+
+def per_subscriber(subscribers: list[queue.SimpleQueue[bytes]]) -> float:
+    start = time.perf_counter()
+    for update in range(UPDATES):
+        for subscriber in subscribers:
+            row = order_row(100 + update / 100, update)
+            subscriber.put_nowait(format_event(row, event="order").encode())
+    return time.perf_counter() - start
+
+
+def broadcast(subscribers: list[queue.SimpleQueue[bytes]]) -> float:
+    updates = Broadcast()
+    for subscriber in subscribers:
+        updates.subscribe(subscriber)
+    start = time.perf_counter()
+    for update in range(UPDATES):
+        updates.publish(order_row(100 + update / 100, update), event="order")
+    return time.perf_counter() - start
+
+
+# Warm up: the first publish() imports asyncio.
+broadcast([])
+
+for count in [10, 100, 1000]:
+    subscribers: list[queue.SimpleQueue[bytes]] = [queue.SimpleQueue() for _ in range(count)]
+    separate = per_subscriber(subscribers) / UPDATES
+    shared = broadcast(subscribers) / UPDATES
+    print(
+        f"{count:>5} subscribers: per subscriber {separate * 1000:>7.2f} ms/update, "
+        f"broadcast {shared * 1000:>5.2f} ms/update"
+    )
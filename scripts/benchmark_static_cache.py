@@ -0,0 +1,41 @@
+"""
+Render pages with a navigation menu and a footer that are either built for
+every page or defined once at the module level. The module level elements are
+static and their HTML is cached after the second render.
+"""
+
+import time
+
+from htpy import Element, a, body, div, footer, li, main, nav, p, ul
+
+PAGES = 2_000
+
+
+def build_nav() -> Element:
+    return nav[ul[tuple(li[a(href=f"/section/{i}")[f"Section {i}"]] for i in range(50))]]
+
+
+def build_footer() -> Element:
+    return footer[
+        p["Some company"],
+        ul[tuple(li[a(href=f"/about/{i}")[f"About {i}"]] for i in range(20))],
+    ]
+
+
+NAV = build_nav()
+FOOTER = build_footer()
+
+
+def built_per_page(i: int) -> str:
+    return str(body[build_nav(), main[div[f"Page {i}"]], build_footer()])
+
+
+def shared(i: int) -> str:
+    return str(body[NAV, main[div[f"Page {i}"]], FOOTER])
+
+
+for name, func in [("built per page", built_per_page), ("module level", shared)]:
+    start = time.perf_counter()
+    for i in range(PAGES):
+        func(i)
+    print(f"{name}: {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from markupsafe import Markup
+
+from htpy import Context, Node, aiter_node, deferred, div, iter_node, li, p, render_node, ul
+from htpy.arena import Arena
+
+
+def test_table() -> None:
+    tree = Arena()
+    tree.open("table", "#report.wide")
+    for row in range(2):
+        tree.open("tr", attrs={"data-row": row})
+        tree.leaf("td", row, class_="cell")
+        tree.leaf("td", "<b>")
+        tree.close()
+    tree.close()
+
+    assert str(tree) == (
+        '<table id="report" class="wide">'
+        '<tr data-row="0"><td class="cell">0</td><td>&lt;b&gt;</td></tr>'
+        '<tr data-row="1"><td class="cell">1</td><td>&lt;b&gt;</td></tr>'
+        "</table>"
+    )
+    assert len(tree) == 7
+
+
+def test_chunks() -> None:
+    tree = Arena()
+    tree.open("ul")
+    tree.leaf("li", "a")
+    tree.open("li")
+    tree.close()
+    tree.close()
+    tree.leaf("br")
+
+    assert list(tree) == ["<ul>", "<li>a</li>", "<li>", "</li>", "</ul>", "<br>"]
+    assert list(iter_node(div[tree])) == ["<div>", *tree, "</div>"]
+    assert render_node(div[tree]) == "<div><ul><li>a</li><li></li></ul><br></div>"
+    assert tree.encode() == b"<ul><li>a</li><li></li></ul><br>"
+
+
+def test_text_and_nodes() -> None:
+    ctx: Context[str] = Context("ctx", default="default")
+
+    @ctx.consumer
+    def display(value: str) -> str:
+        return value
+
+    tree = Arena()
+    tree.open("p")
+    tree.text("a & b")
+    tree.text(Markup("<br>"))
+    tree.node(div[display()])
+    tree.close()
+
+    assert str(tree) == "<p>a &amp; b<br><div>default</div></p>"
+    assert str(ctx.provider("provided", lambda: tree)) == "<p>a &amp; b<br><div>provided</div></p>"
+
+
+def test_async_nodes() -> None:
+    async def title() -> str:
+        await asyncio.sleep(0)
+        return "title"
+
+    async def render(node: Node) -> str:
+        return "".join([chunk async for chunk in aiter_node(node)])
+
+    tree = Arena()
+    tree.open("div")
+    tree.node(p[title()])
+    tree.close()
+
+    assert asyncio.run(render(tree)) == "<div><p>title</p></div>"
+
+
+def test_executor() -> None:
+    def slow() -> Node:
+        time.sleep(0.1)
+        return li["x"]
+
+    tree = Arena()
+    tree.node(ul[[slow] * 4])
+    with ThreadPoolExecutor(4) as executor:
+        start = time.perf_counter()
+        result = "".join(iter_node(tree, executor=executor))
+        assert time.perf_counter() - start < 0.3
+    assert result == "<ul>" + "<li>x</li>" * 4 + "</ul>"
+
+
+def test_deferred_node() -> None:
+    tree = Arena()
+    tree.open("body")
+    tree.node(deferred("Loading...", "done"))
+    tree.text("after")
+    tree.close()
+
+    result = "".join(iter_node(tree))
+    assert result.startswith("<body><!--htpy:")
+    assert "Loading...<!--/htpy:" in result
+    assert '<template id="htpy:' in result.split("after</body>")[1]
+    assert str(tree) == "<body>doneafter</body>"
+
+
+def test_closes_nested_elements_at_the_same_position() -> None:
+    tree = Arena()
+    tree.open("div")
+    tree.open("section")
+    tree.open("p")
+    tree.text("x")
+    tree.close()
+    tree.close()
+    tree.close()
+    tree.text("after")
+
+    assert str(tree) == "<div><section><p>x</p></section></div>after"
+
+
+def test_void_element_with_children() -> None:
+    tree = Arena()
+    with pytest.raises(ValueError, match="<br> is a void element"):
+        tree.open("br")
+    with pytest.raises(ValueError, match="<img> is a void element"):
+        tree.leaf("img", "text")
+
+
+def test_close_without_open() -> None:
+    with pytest.raises(ValueError, match="there is no open element to close"):
+        Arena().close()
+
+
+def test_render_unclosed() -> None:
+    tree = Arena()
+    tree.open("div")
+    tree.open("span")
+    with pytest.raises(ValueError, match="<span> was opened but never closed"):
+        str(tree)
@@ -0,0 +1,235 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from markupsafe import Markup
+
+from htpy import Context, Node, aiter_node, div, flush, li, render_node, ul
+
+
+async def render(node: Node) -> list[str]:
+    return [chunk async for chunk in aiter_node(node)]
+
+
+def test_sync_nodes() -> None:
+    node = div[ul[li["a"], li[1]], [None, "b"], lambda: "c"]
+    assert asyncio.run(render(node)) == [
+        "<div>",
+        "<ul>",
+        "<li>",
+        "a",
+        "</li>",
+        "<li>",
+        "1",
+        "</li>",
+        "</ul>",
+        "b",
+        "c",
+        "</div>",
+    ]
+
+
+def test_coroutine() -> None:
+    async def title() -> Node:
+        await asyncio.sleep(0)
+        return div["title"]
+
+    assert asyncio.run(render(div[title()])) == ["<div>", "<div>", "title", "</div>", "</div>"]
+
+
+def test_async_function() -> None:
+    async def title() -> str:
+        await asyncio.sleep(0)
+        return "<title>"
+
+    assert asyncio.run(render(div[title])) == ["<div>", "&lt;title&gt;", "</div>"]
+
+
+def test_async_generator() -> None:
+    async def rows() -> AsyncIterator[Node]:
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield li[i]
+
+    assert "".join(asyncio.run(render(ul[rows(), li["last"]]))) == (
+        "<ul><li>0</li><li>1</li><li>2</li><li>last</li></ul>"
+    )
+
+
+def test_empty_async_generator() -> None:
+    async def rows() -> AsyncIterator[Node]:
+        return
+        yield
+
+    assert asyncio.run(render(ul[rows()])) == ["<ul>", "</ul>"]
+
+
+def test_future() -> None:
+    async def main() -> list[str]:
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        future.set_result("done")
+        return await render(div[future])
+
+    assert asyncio.run(main()) == ["<div>", "done", "</div>"]
+
+
+def test_nested_awaitables() -> None:
+    async def inner() -> str:
+        return "inner"
+
+    async def outer() -> Node:
+        return div[inner()]
+
+    async def items() -> AsyncIterator[Node]:
+        yield outer()
+
+    assert "".join(asyncio.run(render(ul[items()]))) == "<ul><div>inner</div></ul>"
+
+
+def test_context_across_awaits() -> None:
+    letter_ctx: Context[str] = Context("letter", default="default")
+
+    @letter_ctx.consumer
+    def display_letter(letter: str) -> str:
+        return letter
+
+    async def rows() -> AsyncIterator[Node]:
+        for _ in range(2):
+            await asyncio.sleep(0)
+            yield li[display_letter()]
+
+    node = letter_ctx.provider("a", lambda: ul[rows()])
+    assert "".join(asyncio.run(render([node, display_letter()]))) == (
+        "<ul><li>a</li><li>a</li></ul>default"
+    )
+
+
+def test_exception() -> None:
+    async def fail() -> str:
+        raise ZeroDivisionError
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(render(div[fail()]))
+
+
+def test_sync_rendering_of_async_children() -> None:
+    async def title() -> str:
+        return "title"
+
+    coroutine = title()
+    with pytest.raises(
+        ValueError,
+        match=r"is not a valid child element in div, use aiter_node\(\) to render async children",
+    ):
+        render_node(div[coroutine])
+    coroutine.close()
+
+
+def test_chunks_are_str() -> None:
+    async def title() -> Node:
+        return Markup("<b>title</b>")
+
+    chunks = asyncio.run(render(div[Markup("<i>x</i>"), title(), flush(), "<&>"]))
+    assert chunks == ["<div>", "<i>x</i>", "<b>title</b>", "&lt;&amp;&gt;", "</div>"]
+    assert all(type(chunk) is str for chunk in chunks)
+
+
+class Test_concurrency:
+    def test_siblings_run_concurrently(self) -> None:
+        running = 0
+        max_running = 0
+
+        async def widget(name: str) -> Node:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return li[name]
+
+        node = ul[[widget(name) for name in "abcdef"]]
+        assert "".join(asyncio.run(render_concurrently(node, None))) == (
+            "<ul><li>a</li><li>b</li><li>c</li><li>d</li><li>e</li><li>f</li></ul>"
+        )
+        assert max_running == 6
+
+    def test_limit(self) -> None:
+        running = 0
+        max_running = 0
+
+        async def widget(name: str) -> str:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return name
+
+        node = div[[widget(name) for name in "abcdef"]]
+        assert "".join(asyncio.run(render_concurrently(node, 2))) == "<div>abcdef</div>"
+        assert max_running == 2
+
+    def test_output_in_document_order(self) -> None:
+        async def widget(name: str, delay: float) -> str:
+            await asyncio.sleep(delay)
+            return name
+
+        node = div[widget("slow", 0.02), "-", widget("fast", 0)]
+        assert asyncio.run(render_concurrently(node, None)) == [
+            "<div>",
+            "slow",
+            "-",
+            "fast",
+            "</div>",
+        ]
+
+    def test_async_functions_are_started(self) -> None:
+        started: list[str] = []
+
+        async def first() -> str:
+            started.append("first")
+            await asyncio.sleep(0.01)
+            return "first"
+
+        async def second() -> str:
+            started.append("second")
+            return "second"
+
+        async def main() -> list[str]:
+            chunks = aiter_node(div[first, second], concurrency=None)
+            result = [await anext(chunks)]
+            await asyncio.sleep(0)
+            assert started == ["first", "second"]
+            return result + [chunk async for chunk in chunks]
+
+        assert asyncio.run(main()) == ["<div>", "first", "second", "</div>"]
+
+    def test_unreached_tasks_are_cancelled(self) -> None:
+        cancelled: list[str] = []
+
+        async def fail() -> str:
+            raise ZeroDivisionError
+
+        async def slow() -> str:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append("slow")
+                raise
+            return "slow"
+
+        async def main() -> None:
+            with pytest.raises(ZeroDivisionError):
+                await render_concurrently(div[fail(), slow()], None)
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        assert cancelled == ["slow"]
+
+    def test_invalid_concurrency(self) -> None:
+        with pytest.raises(ValueError, match="concurrency must be at least 1 or None, got 0"):
+            asyncio.run(render_concurrently(div, 0))
+
+
+async def render_concurrently(node: Node, concurrency: int | None) -> list[str]:
+    return [chunk async for chunk in aiter_node(node, concurrency=concurrency)]
@@ -1,8 +1,10 @@
 import typing as t
+from collections.abc import Iterator
 
 import pytest
 from markupsafe import Markup
 
+import htpy
 from htpy import button, div, th
 
 
@@ -199,3 +201,40 @@ def test_invalid_attribute_key(not_an_attr: t.Any) -> None:
 def test_invalid_attribute_value(not_an_attr: t.Any) -> None:
     with pytest.raises(ValueError, match="Attribute value must be a string"):
         div(foo=not_an_attr)
+
+
+class Test_attribute_cache:
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self) -> Iterator[None]:
+        htpy.set_attribute_cache_size(100)
+        yield
+        htpy.set_attribute_cache_size(2048)
+
+    def test_hit(self) -> None:
+        assert str(div(".a", {"b": "c"}, d="<")) == """<div class="a" b="c" d="&lt;"></div>"""
+        assert str(div(".a", {"b": "c"}, d="<")) == """<div class="a" b="c" d="&lt;"></div>"""
+        assert htpy.attribute_cache_info() == htpy.CacheInfo(
+            hits=1, misses=1, maxsize=100, currsize=1
+        )
+
+    def test_equal_values_of_different_types(self) -> None:
+        assert str(div(x=1)) == """<div x="1"></div>"""
+        assert str(div(x=True)) == """<div x></div>"""
+        assert str(div(x=0)) == """<div x="0"></div>"""
+        assert str(div(x=False)) == """<div></div>"""
+
+    def test_unhashable_values_are_not_cached(self) -> None:
+        assert str(div(class_={"a": True})) == """<div class="a"></div>"""
+        assert str(div(class_=["a", "b"])) == """<div class="a b"></div>"""
+        assert htpy.attribute_cache_info().currsize == 0
+
+    def test_disable(self) -> None:
+        htpy.set_attribute_cache_size(0)
+        assert str(div(x="y")) == """<div x="y"></div>"""
+        assert htpy.attribute_cache_info() == htpy.CacheInfo(
+            hits=0, misses=0, maxsize=0, currsize=0
+        )
+
+    def test_negative_size(self) -> None:
+        with pytest.raises(ValueError, match="maxsize must not be negative"):
+            htpy.set_attribute_cache_size(-1)
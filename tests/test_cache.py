@@ -0,0 +1,289 @@
+import asyncio
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from htpy import (
+    CacheAdapter,
+    Context,
+    FragmentCacheInfo,
+    LRUCache,
+    Node,
+    aiter_node,
+    body,
+    cache,
+    compiled,
+    deferred,
+    div,
+    flush,
+    fragment_cache_info,
+    iter_bytes,
+    iter_node,
+    li,
+    render_node,
+    set_fragment_cache,
+    static,
+    ul,
+)
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def card(self, title: str) -> Node:
+        def render() -> Node:
+            self.calls += 1
+            return div(".card")[title]
+
+        return render
+
+
+class DictCache:
+    """Like Django's cache framework: get() with a default and set() with a timeout."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, t.Any] = {}
+        self.timeouts: dict[str, float | None] = {}
+
+    def get(self, key: str, default: t.Any = None) -> t.Any:
+        return self.data.get(key, default)
+
+    def set(self, key: str, value: t.Any, timeout: float | None = None) -> None:
+        self.data[key] = value
+        self.timeouts[key] = timeout
+
+
+def test_renders_once() -> None:
+    backend = LRUCache()
+    counter = Counter()
+
+    def page() -> Node:
+        return ul[li[cache("card", backend=backend)[counter.card("a")]]]
+
+    assert render_node(page()) == '<ul><li><div class="card">a</div></li></ul>'
+    assert render_node(page()) == '<ul><li><div class="card">a</div></li></ul>'
+    assert counter.calls == 1
+    assert backend.cache_info()[:3] == (1, 1, 0)
+
+
+def test_keys() -> None:
+    backend = LRUCache()
+    result = render_node([cache(key, backend=backend)[key] for key in ["a", "b", "a"]])
+    assert result == "aba"
+    assert backend.cache_info()[:2] == (1, 2)
+
+
+def test_streaming_miss_fills_cache() -> None:
+    backend = LRUCache()
+    node = div[cache("rows", backend=backend)[ul[(li[i] for i in range(3))]]]
+    chunks = list(iter_node(node))
+    assert chunks[:4] == ["<div>", "<ul>", "<li>", "0"]
+    assert backend.get("rows") == "<ul><li>0</li><li>1</li><li>2</li></ul>"
+    assert list(iter_node(node)) == ["<div>", "<ul><li>0</li><li>1</li><li>2</li></ul>", "</div>"]
+
+
+def test_closed_stream_is_not_stored() -> None:
+    backend = LRUCache()
+    chunks = iter_node(cache("rows", backend=backend)[ul[li["a"], li["b"]]])
+    assert next(chunks) == "<ul>"
+    chunks.close()
+    assert backend.get("rows") is None
+
+
+def test_exception_is_not_stored() -> None:
+    backend = LRUCache()
+
+    def fail() -> Node:
+        raise ZeroDivisionError
+
+    with pytest.raises(ZeroDivisionError):
+        render_node(cache("fail", backend=backend)[div[fail]])
+    assert backend.get("fail") is None
+
+
+def test_flush() -> None:
+    backend = LRUCache()
+    node = cache("page", backend=backend)[div["head"], flush(), div["body"]]
+    assert list(iter_bytes(node, min_chunk=1 << 20)) == [b"<div>head</div>", b"<div>body</div>"]
+    assert backend.get("page") == "<div>head</div><div>body</div>"
+
+
+def test_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = time.monotonic()
+    monkeypatch.setattr("htpy._monotonic", lambda: now)
+    backend = LRUCache()
+    counter = Counter()
+    node = cache("card", ttl=60, backend=backend)[counter.card("a")]
+    render_node(node)
+    now += 59
+    render_node(node)
+    assert counter.calls == 1
+    now += 1
+    render_node(node)
+    assert counter.calls == 2
+    assert backend.cache_info()[:2] == (1, 2)
+
+
+def test_context() -> None:
+    letter_ctx: Context[str] = Context("letter")
+
+    @letter_ctx.consumer
+    def display_letter(letter: str) -> str:
+        return letter
+
+    backend = LRUCache()
+    node = letter_ctx.provider("a", lambda: div[cache("letter", backend=backend)[display_letter()]])
+    assert render_node(node) == "<div>a</div>"
+    assert backend.get("letter") == "a"
+
+
+def test_default_backend() -> None:
+    backend = LRUCache()
+    set_fragment_cache(backend)
+    try:
+        assert render_node(cache("default")["x"]) == "x"
+        assert render_node(cache("default")["y"]) == "x"
+        assert fragment_cache_info()[:2] == (1, 1)
+    finally:
+        set_fragment_cache()
+    assert fragment_cache_info()[:2] == (0, 0)
+
+
+def test_static() -> None:
+    with pytest.raises(ValueError, match="static\\(\\) cannot render <cache 'a'>: it is served"):
+        static(div[cache("a")["a"]])
+
+
+def test_compiled_is_not_traced() -> None:
+    backend = LRUCache()
+
+    @compiled
+    def card(title: str) -> Node:
+        return div[cache(f"card:{title}", backend=backend)[title]]
+
+    assert render_node(card("a")) == "<div>a</div>"
+    assert render_node(card("b")) == "<div>b</div>"
+    assert backend.get("card:a") == "a"
+
+
+def test_async() -> None:
+    backend = LRUCache()
+
+    async def title() -> str:
+        await asyncio.sleep(0)
+        return "title"
+
+    async def render(node: Node) -> str:
+        return "".join([chunk async for chunk in aiter_node(node)])
+
+    assert asyncio.run(render(div[cache("title", backend=backend)[li[title()]]])) == (
+        "<div><li>title</li></div>"
+    )
+    assert backend.get("title") == "<li>title</li>"
+
+
+def test_executor() -> None:
+    backend = LRUCache()
+
+    def slow() -> Node:
+        time.sleep(0.1)
+        return li["x"]
+
+    node = ul[cache("rows", backend=backend)[[slow] * 4]]
+    with ThreadPoolExecutor(4) as executor:
+        start = time.perf_counter()
+        result = "".join(iter_node(node, executor=executor))
+        assert time.perf_counter() - start < 0.3
+    assert result == "<ul>" + "<li>x</li>" * 4 + "</ul>"
+    assert backend.get("rows") == "<li>x</li>" * 4
+
+
+def test_deferred() -> None:
+    backend = LRUCache()
+    node = body[cache("page", backend=backend)[div[deferred("Loading...", "done")]]]
+    result = "".join(iter_node(node))
+    assert "<div><!--htpy:" in result
+    assert result.endswith("</script></body>")
+    # Only the fallback was rendered in place of the deferred node.
+    assert backend.get("page") is None
+    assert render_node(node) == "<body><div>done</div></body>"
+    assert backend.get("page") == "<div>done</div>"
+
+
+def test_invalid_ttl() -> None:
+    with pytest.raises(ValueError, match="ttl must be positive or None, got 0"):
+        cache("a", ttl=0)
+
+
+class Test_LRUCache:
+    def test_bounded_by_size(self) -> None:
+        backend = LRUCache(maxsize=1000)
+        for i in range(100):
+            backend.set(str(i), "x" * 100)
+        info = backend.cache_info()
+        assert info.currsize <= 1000
+        assert info.evictions > 90
+        assert backend.get("99") == "x" * 100
+        assert backend.get("0") is None
+
+    def test_least_recently_used_is_evicted(self) -> None:
+        backend = LRUCache()
+        backend.set("a", "a" * 100)
+        backend.set("b", "b" * 100)
+        backend.maxsize = backend.cache_info().currsize
+        assert backend.get("a") is not None
+        backend.set("c", "c" * 100)
+        assert backend.get("a") is not None
+        assert backend.get("b") is None
+        assert backend.cache_info().evictions == 1
+
+    def test_too_large_is_not_stored(self) -> None:
+        backend = LRUCache(maxsize=100)
+        backend.set("a", "a" * 1000)
+        assert backend.cache_info() == FragmentCacheInfo(0, 0, 0, 100, 0)
+        assert backend.get("a") is None
+
+    def test_replace(self) -> None:
+        backend = LRUCache()
+        backend.set("a", "old")
+        size = backend.cache_info().currsize
+        backend.set("a", "new")
+        assert backend.get("a") == "new"
+        assert backend.cache_info().currsize == size
+
+    def test_clear(self) -> None:
+        backend = LRUCache()
+        backend.set("a", "a")
+        backend.clear()
+        assert backend.get("a") is None
+        assert backend.cache_info().currsize == 0
+
+    def test_invalid_maxsize(self) -> None:
+        with pytest.raises(ValueError, match="maxsize must not be negative"):
+            LRUCache(maxsize=-1)
+
+
+class Test_CacheAdapter:
+    def test_get_set(self) -> None:
+        store = DictCache()
+        backend = CacheAdapter(store)
+        counter = Counter()
+        node = cache("card", ttl=300, backend=backend)[counter.card("a")]
+        assert render_node(node) == render_node(node) == '<div class="card">a</div>'
+        assert counter.calls == 1
+        assert store.data == {"htpy:card": '<div class="card">a</div>'}
+        assert store.timeouts == {"htpy:card": 300}
+        assert backend.cache_info() == FragmentCacheInfo(1, 1, 0, 0, 0)
+
+    def test_no_ttl_uses_backend_default(self) -> None:
+        store = DictCache()
+        render_node(cache("a", backend=CacheAdapter(store, prefix="p:"))["a"])
+        assert store.timeouts == {"p:a": None}
+
+    def test_bytes(self) -> None:
+        store = DictCache()
+        store.data["htpy:a"] = "<b>å</b>".encode()
+        assert render_node(cache("a", backend=CacheAdapter(store))["a"]) == "<b>å</b>"
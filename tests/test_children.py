@@ -3,6 +3,7 @@ from __future__ import annotations
 import dataclasses
 import datetime
 import decimal
+import enum
 import pathlib
 import re
 import typing as t
@@ -11,10 +12,29 @@ import pytest
 from markupsafe import Markup
 from typing_extensions import assert_type
 
-from htpy import Element, VoidElement, dd, div, dl, dt, html, img, input, li, my_custom_element, ul
+import htpy
+from htpy import (
+    Element,
+    VoidElement,
+    body,
+    dd,
+    div,
+    dl,
+    dt,
+    html,
+    img,
+    input,
+    li,
+    my_custom_element,
+    table,
+    tbody,
+    td,
+    tr,
+    ul,
+)
 
 if t.TYPE_CHECKING:
-    from collections.abc import Callable, Generator
+    from collections.abc import Callable, Generator, Iterator
 
     from htpy import Node
 
@@ -207,6 +227,68 @@ def test_callable_in_generator() -> None:
     assert str(div[((lambda: "hi") for _ in range(1))]) == "<div>hi</div>"
 
 
+class MyStr(str):
+    pass
+
+
+class HtmlList(list[str]):
+    def __html__(self) -> str:
+        return "<ul>html</ul>"
+
+
+class Number(enum.IntEnum):
+    ONE = 1
+
+
+def test_str_subclass() -> None:
+    assert str(div[MyStr("<a>")]) == "<div>&lt;a&gt;</div>"
+
+
+def test_int_subclass() -> None:
+    assert str(div[Number.ONE]) == "<div>1</div>"
+
+
+def test_html_takes_precedence_over_iteration() -> None:
+    assert str(div[HtmlList(["a", "b"])]) == "<div><ul>html</ul></div>"
+
+
+class Proxy:
+    """Forwards attribute access and iteration, like Django's SimpleLazyObject."""
+
+    def __init__(self, wrapped: t.Any) -> None:
+        self._wrapped = wrapped
+
+    def __getattr__(self, name: str) -> t.Any:
+        return getattr(self._wrapped, name)
+
+    def __iter__(self) -> t.Iterator[t.Any]:
+        return iter(self._wrapped)
+
+    def __str__(self) -> str:
+        return str(self._wrapped)
+
+
+@pytest.mark.parametrize(
+    ("wrapped", "expected"),
+    [
+        (Markup("<b>x</b>"), "<div><b>x</b></div>"),
+        (["a", "<b>"], "<div>a&lt;b&gt;</div>"),
+    ],
+)
+def test_proxy(wrapped: t.Any, expected: str) -> None:
+    # The same class provides __html__ for some objects only.
+    assert str(div[Proxy(wrapped)]) == expected
+    assert "".join(htpy.iter_node(div[Proxy(wrapped)])) == expected
+
+
+def test_callable_object() -> None:
+    class Component:
+        def __call__(self) -> str:
+            return "called"
+
+    assert str(div[Component()]) == "<div>called</div>"
+
+
 @dataclasses.dataclass
 class MyDataClass:
     name: str
@@ -272,3 +354,49 @@ def test_invalid_child_lazy_generator(not_a_child: t.Any) -> None:
     element = div[gen()]
     with pytest.raises(ValueError, match="is not a valid child element"):
         str(element)
+
+
+@pytest.mark.parametrize("not_a_child", _invalid_children)
+def test_invalid_child_lazy_path(not_a_child: t.Any) -> None:
+    element = html[body[table[tbody[[tr[td["a"]], tr[td[lambda: not_a_child]]]]]]]
+    with pytest.raises(
+        ValueError,
+        match=re.escape(
+            f"{not_a_child!r} is not a valid child element "
+            "in html > body > table > tbody > tr[1] > td"
+        ),
+    ):
+        str(element)
+
+
+class Test_render_validation:
+    @pytest.fixture(autouse=True)
+    def _render_validation(self) -> Iterator[None]:
+        htpy.set_child_validation("render")
+        yield
+        htpy.set_child_validation("build")
+
+    @pytest.mark.parametrize("not_a_child", _invalid_children)
+    def test_invalid_child_not_validated_on_build(self, not_a_child: t.Any) -> None:
+        element = ul[li["a"], li[[not_a_child]]]
+
+        with pytest.raises(
+            ValueError, match=re.escape("is not a valid child element in ul > li[1]")
+        ):
+            str(element)
+
+    def test_generator_children(self) -> None:
+        values: list[t.Any] = [1, 2.0]
+        element = ul[(li[x] for x in values)]
+
+        with pytest.raises(
+            ValueError, match=re.escape("2.0 is not a valid child element in ul > li")
+        ):
+            list(element)
+
+    def test_valid_children(self) -> None:
+        assert str(ul[[li["a"]], li[1]]) == "<ul><li>a</li><li>1</li></ul>"
+
+    def test_invalid_mode(self) -> None:
+        with pytest.raises(ValueError, match='mode must be "build" or "render"'):
+            htpy.set_child_validation("never")  # type: ignore[arg-type]
@@ -0,0 +1,221 @@
+import typing as t
+
+import pytest
+from markupsafe import Markup
+
+import htpy
+from htpy import Context, a, div, h2, li, p, span, ul
+
+
+class Calls:
+    def __init__(self) -> None:
+        self.count = 0
+
+
+@pytest.fixture
+def calls() -> Calls:
+    return Calls()
+
+
+def test_fills_slots(calls: Calls) -> None:
+    @htpy.compiled
+    def card(title: str, body: str | int, href: str = "/") -> htpy.Node:
+        calls.count += 1
+        return div(".card")[h2[title], p[body], a(href=href, title=title)["More"]]
+
+    for i in range(3):
+        result = card("<b>", i, href=f"/{i}")
+        assert isinstance(result, Markup)
+        assert result == (
+            f'<div class="card"><h2>&lt;b&gt;</h2><p>{i}</p>'
+            f'<a href="/{i}" title="&lt;b&gt;">More</a></div>'
+        )
+
+    # Traced once and checked against the component once.
+    assert calls.count == 2
+
+
+def test_node_argument(calls: Calls) -> None:
+    @htpy.compiled
+    def item(content: htpy.Node) -> htpy.Node:
+        calls.count += 1
+        return li(".item")[content]
+
+    item("plain")
+    item("checked")
+    # Elements, Markup and None are compiled as separate variants.
+    assert str(item(span["element"])) == '<li class="item"><span>element</span></li>'
+    assert str(ul[item(Markup("<br>")), item(None)]) == (
+        '<ul><li class="item"><br></li><li class="item"></li></ul>'
+    )
+    assert calls.count == 8
+    assert str(item(span["again"])) == '<li class="item"><span>again</span></li>'
+    assert str(item(Markup("<hr>"))) == '<li class="item"><hr></li>'
+    assert calls.count == 8
+
+
+def test_node_argument_renders_in_context() -> None:
+    ctx: Context[str] = Context("ctx")
+
+    @ctx.consumer
+    def display(value: str) -> str:
+        return value
+
+    @htpy.compiled
+    def item(content: htpy.Node) -> htpy.Node:
+        return li[content]
+
+    item("verify")
+    result = ctx.provider("provided", lambda: item(display()))
+    assert str(result) == "<li>provided</li>"
+
+
+def test_variant_per_bool(calls: Calls) -> None:
+    @htpy.compiled
+    def button(label: str, disabled: bool) -> htpy.Node:
+        calls.count += 1
+        return htpy.button(disabled=disabled)[label]
+
+    for _ in range(2):
+        assert button("Save", True) == "<button disabled>Save</button>"
+        assert button("Save", False) == "<button>Save</button>"
+
+    assert calls.count == 4
+
+
+def test_variant_per_type(calls: Calls) -> None:
+    @htpy.compiled
+    def cell(value: str | int) -> htpy.Node:
+        calls.count += 1
+        if isinstance(value, str):
+            return htpy.td(".text")[value]
+        return htpy.td(".num")[value]
+
+    for _ in range(2):
+        assert str(cell(1)) == '<td class="num">1</td>'
+        assert str(cell("a")) == '<td class="text">a</td>'
+        assert str(cell(2)) == '<td class="num">2</td>'
+        assert str(cell("b")) == '<td class="text">b</td>'
+
+
+def test_branching_is_not_compiled(calls: Calls) -> None:
+    @htpy.compiled
+    def greeting(name: str) -> htpy.Node:
+        calls.count += 1
+        return div[name] if name else span
+
+    assert str(greeting("Ada")) == "<div>Ada</div>"
+    assert str(greeting("")) == "<span></span>"
+    assert str(greeting("Ada")) == "<div>Ada</div>"
+    # The failed trace and three regular calls.
+    assert calls.count == 4
+
+
+def test_loop_is_not_compiled() -> None:
+    @htpy.compiled
+    def items(values: list[str]) -> htpy.Node:
+        return ul[(li[value] for value in values)]
+
+    assert str(items(["a", "b"])) == "<ul><li>a</li><li>b</li></ul>"
+
+
+def test_context_consumer_is_not_compiled() -> None:
+    ctx: Context[str] = Context("ctx", default="default")
+
+    @ctx.consumer
+    def display(value: str, label: str) -> str:
+        return f"{label}: {value}"
+
+    @htpy.compiled
+    def component(label: str) -> htpy.Node:
+        return div[display(label)]
+
+    assert str(component("a")) == "<div>a: default</div>"
+    assert str(ctx.provider("provided", lambda: component("a"))) == "<div>a: provided</div>"
+
+
+def test_modified_argument_is_not_compiled() -> None:
+    @htpy.compiled
+    def shout(text: str) -> htpy.Node:
+        return div[str(text).upper()]
+
+    assert str(shout("hello")) == "<div>HELLO</div>"
+    assert str(shout("again")) == "<div>AGAIN</div>"
+
+
+def lower(name: str) -> htpy.Node:
+    return div[str(name).lower()]
+
+
+def truncate(name: str) -> htpy.Node:
+    return div[f"{name}"[:3]]
+
+
+def replace(name: str) -> htpy.Node:
+    return div[f"{name}".replace("-", " ")]
+
+
+def icon_markup(icon: str) -> htpy.Node:
+    return div[Markup(f'<i class="{icon}">')]
+
+
+def formatted_comment(text: str) -> htpy.Node:
+    return div[htpy.comment(f"{text}")]
+
+
+@pytest.mark.parametrize(
+    ("component", "expected"),
+    [
+        (lower, {"alice": "<div>alice</div>", "Bob": "<div>bob</div>"}),
+        (truncate, {"abc": "<div>abc</div>", "abcdef": "<div>abc</div>"}),
+        (replace, {"ab": "<div>ab</div>", "a-b": "<div>a b</div>"}),
+        (icon_markup, {"ab": '<div><i class="ab"></div>', "a&b": '<div><i class="a&b"></div>'}),
+        (formatted_comment, {"ab": "<div><!-- ab --></div>", "a&b": "<div><!-- a&b --></div>"}),
+    ],
+)
+def test_str_argument_is_not_compiled(
+    component: t.Callable[[str], htpy.Node], expected: dict[str, str]
+) -> None:
+    # The first value renders the same with and without the change made to
+    # the argument, so a wrongly compiled component would pass verification.
+    compiled_component = htpy.compiled(component)
+    for _ in range(2):
+        for value, html in expected.items():
+            assert str(compiled_component(value)) == html
+
+
+def test_class_argument_is_not_compiled() -> None:
+    @htpy.compiled
+    def box(classes: t.Any) -> htpy.Node:
+        return div(class_=classes)
+
+    assert str(box("a")) == '<div class="a"></div>'
+    assert str(box(["b", "c"])) == '<div class="b c"></div>'
+
+
+def test_attribute_argument_falls_back() -> None:
+    @htpy.compiled
+    def box(title: t.Any) -> htpy.Node:
+        return div(title=title)
+
+    assert box("a") == '<div title="a"></div>'
+    assert box(1) == '<div title="1"></div>'
+    with pytest.raises(ValueError, match="Attribute value must be a string or an integer"):
+        box(1.5)
+
+
+def test_keyword_only_arguments() -> None:
+    @htpy.compiled
+    def link(href: str, *, text: str = "link") -> htpy.Node:
+        return a(href=href)[text]
+
+    assert link("/a") == '<a href="/a">link</a>'
+    assert link(href="/b", text="b") == '<a href="/b">b</a>'
+    assert link("/c", text="c") == '<a href="/c">c</a>'
+
+
+def test_variadic_arguments_are_not_compiled() -> None:
+    def component(*args: str) -> htpy.Node:
+        return div[args]
+
+    assert htpy.compiled(component) is component
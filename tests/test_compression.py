@@ -0,0 +1,57 @@
+import gzip
+import zlib
+from collections.abc import Callable, Iterator
+
+import pytest
+
+import htpy
+from htpy import body, div, head, html, iter_deflate, iter_gzip, li, title, ul
+
+
+def page() -> htpy.Element:
+    return html[
+        head[title["hello"]],
+        body[ul[(li[str(i)] for i in range(1000))], htpy.flush(), div["end"]],
+    ]
+
+
+def decompressed_chunks(chunks: Iterator[bytes], wbits: int) -> list[bytes]:
+    decompressor = zlib.decompressobj(wbits)
+    return [decompressor.decompress(chunk) for chunk in chunks]
+
+
+def test_gzip() -> None:
+    assert gzip.decompress(b"".join(iter_gzip(page()))) == str(page()).encode()
+
+
+def test_deflate() -> None:
+    assert zlib.decompress(b"".join(iter_deflate(page()))) == str(page()).encode()
+
+
+@pytest.mark.parametrize(
+    ("func", "wbits"),
+    [(iter_gzip, zlib.MAX_WBITS | 16), (iter_deflate, zlib.MAX_WBITS)],
+)
+def test_flushes_after_head_and_flush_markers(
+    func: Callable[[htpy.Node], Iterator[bytes]], wbits: int
+) -> None:
+    chunks = decompressed_chunks(func(page()), wbits)
+
+    # Everything sent so far can be decompressed at the flush points.
+    assert chunks[0] == b"<!doctype html><html><head><title>hello</title></head>"
+    assert chunks[1].endswith(b"<li>999</li></ul>")
+    assert b"".join(chunks) == str(page()).encode()
+
+
+def test_level() -> None:
+    text = ul[[li[str(i)] for i in range(1000)]]
+    stored = b"".join(iter_gzip(text, level=0))
+    compressed = b"".join(iter_gzip(text, level=9))
+    assert gzip.decompress(stored) == gzip.decompress(compressed) == str(text).encode()
+    assert len(compressed) < len(stored) / 5
+
+
+def test_encoding() -> None:
+    assert gzip.decompress(b"".join(iter_gzip(div["åäö"], encoding="latin-1"))) == (
+        "<div>åäö</div>".encode("latin-1")
+    )
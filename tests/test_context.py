@@ -88,3 +88,69 @@ def test_context_passed_via_iterable() -> None:
     result = div[ctx.provider("foo", lambda: [echo()])]
 
     assert str(result) == "<div>foo</div>"
+
+
+def test_deeply_nested_providers() -> None:
+    contexts = [Context[int](f"ctx{i}") for i in range(1000)]
+
+    @contexts[0].consumer
+    def outermost(value: int) -> int:
+        return value
+
+    @contexts[-1].consumer
+    def innermost(value: int) -> int:
+        return value
+
+    node: Node = div[outermost(), " ", innermost()]
+    for i, context in reversed(list(enumerate(contexts))):
+        node = context.provider(i, lambda node=node: node)  # type: ignore[misc]
+
+    assert str(node) == "<div>0 999</div>"
+
+
+def test_sibling_providers_do_not_leak() -> None:
+    result = div[
+        letter_ctx.provider("b", lambda: display_letter("first")),
+        display_letter("second"),
+    ]
+    assert str(result) == "<div>first: b!second: a!</div>"
+
+
+class Test_lazy_provider:
+    def test_called_once(self) -> None:
+        calls: list[str] = []
+
+        def factory() -> t.Literal["b"]:
+            calls.append("called")
+            return "b"
+
+        result = letter_ctx.lazy_provider(
+            factory, lambda: div[display_letter("one"), display_letter("two")]
+        )
+        assert calls == []
+        assert str(result) == "<div>one: b!two: b!</div>"
+        assert calls == ["called"]
+
+        # A new render calls the factory again.
+        assert str(result) == "<div>one: b!two: b!</div>"
+        assert calls == ["called", "called"]
+
+    def test_not_consumed(self) -> None:
+        def factory() -> t.Literal["b"]:
+            raise AssertionError("should not be called")
+
+        result = letter_ctx.lazy_provider(factory, lambda: div["no consumers"])
+        assert str(result) == "<div>no consumers</div>"
+
+    def test_shadowed(self) -> None:
+        def factory() -> t.Literal["b"]:
+            raise AssertionError("should not be called")
+
+        result = letter_ctx.lazy_provider(
+            factory, lambda: letter_ctx.provider("c", lambda: display_letter("inner"))
+        )
+        assert str(result) == "inner: c!"
+
+    def test_iter(self) -> None:
+        result = letter_ctx.lazy_provider(lambda: "c", lambda: div[display_letter("hi")])
+        assert list(result) == ["<div>", "hi: c!", "</div>"]
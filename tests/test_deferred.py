@@ -0,0 +1,200 @@
+import asyncio
+import re
+import threading
+import time
+
+import pytest
+
+from htpy import (
+    Context,
+    Node,
+    aiter_node,
+    body,
+    compiled,
+    deferred,
+    div,
+    html,
+    iter_bytes,
+    iter_node,
+    li,
+    p,
+    render_node,
+    static,
+    ul,
+)
+
+
+def slow(text: str, delay: float = 0.05) -> Node:
+    def node() -> Node:
+        time.sleep(delay)
+        return p[text]
+
+    return node
+
+
+def keys(html: str) -> list[str]:
+    return re.findall(r'<template id="htpy:([^"]+)">', html)
+
+
+def test_fallback_and_template() -> None:
+    result = "".join(iter_node(div[deferred("Loading...", slow("done")), "after"]))
+    [key] = keys(result)
+    assert result.startswith(f"<div><!--htpy:{key}-->Loading...<!--/htpy:{key}-->after</div>")
+    assert result.endswith(
+        f'<template id="htpy:{key}"><p>done</p></template><script>htpySwap("{key}")</script>'
+    )
+    assert result.count("function htpySwap") == 1
+
+
+def test_rest_of_page_is_not_blocked() -> None:
+    chunks = iter_node(div[deferred("Loading...", slow("done", 0.2)), "after"])
+    start = time.perf_counter()
+    for chunk in chunks:
+        if chunk == "after":
+            break
+    assert time.perf_counter() - start < 0.1
+    assert "<p>done</p>" in "".join(chunks)
+
+
+def test_resolved_concurrently_in_order_of_completion() -> None:
+    node = ul[
+        li[deferred("1", slow("slow", 0.2))],
+        li[deferred("2", slow("fast", 0.1))],
+        li[deferred("3", slow("fastest", 0))],
+    ]
+    start = time.perf_counter()
+    result = "".join(iter_node(node))
+    assert time.perf_counter() - start < 0.3
+    assert re.findall(r"<template[^>]*><p>(\w+)</p>", result) == ["fastest", "fast", "slow"]
+    assert len(set(keys(result))) == 3
+
+
+def test_emitted_before_body_end() -> None:
+    result = "".join(iter_node(html[body[deferred("...", p["x"])]]))
+    assert result.endswith("</script></body></html>")
+    assert "<template" in result
+
+
+def test_flushed_before_waiting() -> None:
+    chunks = list(iter_bytes(body[deferred("...", slow("done")), "after"], min_chunk=1 << 20))
+    assert chunks[0].endswith(b"after")
+    assert b"<p>done</p>" in chunks[1]
+
+
+def test_render_node_renders_in_place() -> None:
+    node = div[deferred("Loading...", lambda: p["done"])]
+    assert render_node(node) == "<div><p>done</p></div>"
+    assert str(deferred("Loading...", "done")) == "done"
+
+
+def test_nested_deferred_renders_in_place() -> None:
+    inner = deferred("inner fallback", p["inner"])
+    result = "".join(iter_node(div[deferred("outer fallback", div[inner])]))
+    [key] = keys(result)
+    assert f'<template id="htpy:{key}"><div><p>inner</p></div></template>' in result
+
+
+def test_context() -> None:
+    letter_ctx: Context[str] = Context("letter")
+    threads: list[threading.Thread] = []
+
+    @letter_ctx.consumer
+    def display_letter(letter: str) -> str:
+        threads.append(threading.current_thread())
+        return letter
+
+    node = letter_ctx.provider("a", lambda: div[deferred("...", display_letter())])
+    assert "<template" in (result := "".join(iter_node(node)))
+    assert re.search(r'<template id="[^"]+">a</template>', result)
+    assert threads != [threading.current_thread()]
+
+
+def test_exception() -> None:
+    def fail() -> Node:
+        raise ZeroDivisionError
+
+    with pytest.raises(ZeroDivisionError):
+        "".join(iter_node(div[deferred("...", fail)]))
+
+
+def test_async() -> None:
+    async def widget(text: str, delay: float) -> Node:
+        await asyncio.sleep(delay)
+        return p[text]
+
+    async def main() -> str:
+        node = div[
+            deferred("1", widget("slow", 0.2)),
+            deferred("2", widget("fast", 0.1)),
+            deferred("3", lambda: p["sync"]),
+        ]
+        return "".join([chunk async for chunk in aiter_node(node)])
+
+    start = time.perf_counter()
+    result = asyncio.run(main())
+    assert time.perf_counter() - start < 0.3
+    assert result.startswith("<div><!--htpy:")
+    assert re.findall(r"<template[^>]*><p>(\w+)</p>", result) == ["sync", "fast", "slow"]
+
+
+def test_async_unfinished_are_cancelled() -> None:
+    cancelled: list[str] = []
+
+    async def widget() -> Node:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("widget")
+            raise
+        return "done"
+
+    async def main() -> None:
+        chunks = aiter_node(div[deferred("...", widget())])
+        assert await anext(chunks) == "<div>"
+        assert (await anext(chunks)).startswith("<!--htpy:")
+        await asyncio.sleep(0)
+        await chunks.aclose()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == ["widget"]
+
+
+def test_async_closed_while_resolving() -> None:
+    cancelled: list[str] = []
+
+    async def widget(text: str, delay: float) -> Node:
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+        return p[text]
+
+    async def main() -> None:
+        chunks = aiter_node(
+            div[deferred("1", widget("fast", 0)), deferred("2", widget("slow", 10))]
+        )
+        async for chunk in chunks:
+            if chunk.startswith("<template"):
+                break
+        await chunks.aclose()
+        await asyncio.sleep(0)
+        # Before asyncio.run() cancels the tasks that are left.
+        assert cancelled == ["slow"]
+
+    asyncio.run(main())
+
+
+def test_static() -> None:
+    with pytest.raises(ValueError, match="static\\(\\) cannot render deferred"):
+        static(div[deferred("...", "done")])
+
+
+def test_compiled() -> None:
+    @compiled
+    def card(title: str) -> Node:
+        return div[title, deferred("...", lambda: p["done"])]
+
+    assert render_node(card("a")) == "<div>a<p>done</p></div>"
+    assert "<!--htpy:" in "".join(iter_node(card("b")))
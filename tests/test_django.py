@@ -6,6 +6,7 @@ from django.forms.utils import ErrorList
 from django.http import HttpRequest
 from django.template import Context, Template, TemplateDoesNotExist
 from django.template.loader import render_to_string
+from django.utils.functional import SimpleLazyObject
 from django.utils.html import escape
 from django.utils.safestring import SafeString
 
@@ -31,6 +32,11 @@ def test_explicit_escape() -> None:
     assert str(result) == "<ul>&lt;hello&gt;</ul>"
 
 
+def test_lazy_object() -> None:
+    result = div[SimpleLazyObject(lambda: SafeString("<b>x</b>"))]
+    assert str(result) == "<div><b>x</b></div>"
+
+
 def test_errorlist() -> None:
     result = div[ErrorList(["my error"])]
     assert str(result) == """<div><ul class="errorlist"><li>my error</li></ul></div>"""
@@ -0,0 +1,98 @@
+from collections.abc import Iterator
+
+import pytest
+from markupsafe import Markup
+
+import htpy
+from htpy import deferred, div, flush, iter_node, span
+
+
+@pytest.fixture(autouse=True)
+def _reset_escaper() -> Iterator[None]:
+    yield
+    htpy.set_escaper()
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("plain", "plain"),
+        ("<>&\"'", "&lt;&gt;&amp;&#34;&#39;"),
+        ("a" * 1000 + "<", "a" * 1000 + "&lt;"),
+    ],
+)
+def test_escape(text: str, expected: str) -> None:
+    assert str(div[text]) == f"<div>{expected}</div>"
+    # Again, from the memo.
+    assert str(div[text]) == f"<div>{expected}</div>"
+    assert str(div(title=text)) == f'<div title="{expected}"></div>'
+
+
+def test_markup_is_not_escaped() -> None:
+    markup = Markup("<b>bold</b>")
+    assert str(div[markup, "<&>"]) == "<div><b>bold</b>&lt;&amp;&gt;</div>"
+    assert list(iter_node(div[markup])) == ["<div>", "<b>bold</b>", "</div>"]
+
+
+def test_chunks_are_str() -> None:
+    def escape(value: str) -> str:
+        return Markup.escape(value)
+
+    htpy.set_escaper(escape)
+    node = div[Markup("<b>x</b>"), "<&>", flush(), deferred("...", span["y"])]
+    chunks = list(iter_node(node))
+    assert all(type(chunk) is str for chunk in chunks)
+
+    # Adding the chunks to a str does not escape them again.
+    html = ""
+    for chunk in iter_node(div[Markup("<b>x</b>"), "<&>"]):
+        html += chunk
+    assert html == "<div><b>x</b>&lt;&amp;&gt;</div>"
+
+
+def test_html_object() -> None:
+    class HasHtml:
+        def __html__(self) -> str:
+            return "<i>html</i>"
+
+    assert str(span[HasHtml()]) == "<span><i>html</i></span>"
+
+
+def test_markup_attribute_is_escaped() -> None:
+    assert str(div(title=Markup("<b>"))) == '<div title="&lt;b&gt;"></div>'
+
+
+def test_custom_escaper() -> None:
+    calls: list[str] = []
+
+    def escape(value: str) -> str:
+        calls.append(value)
+        return value.replace("&", "&amp;").replace("<", "&lt;").replace("`", "&#96;")
+
+    htpy.set_escaper(escape)
+    assert str(div["`<`"]) == "<div>&#96;&lt;&#96;</div>"
+    assert str(div["`<`"]) == "<div>&#96;&lt;&#96;</div>"
+    assert calls == ["`<`"]
+
+
+def test_custom_escaper_clears_attribute_cache() -> None:
+    assert str(div(title="a`b")) == '<div title="a`b"></div>'
+    htpy.set_escaper(lambda value: str(Markup.escape(value)).replace("`", "&#96;"))
+    assert str(div(title="a`b")) == '<div title="a&#96;b"></div>'
+
+
+def test_memo_disabled() -> None:
+    calls: list[str] = []
+
+    def escape(value: str) -> str:
+        calls.append(value)
+        return value
+
+    htpy.set_escaper(escape, memo_size=0)
+    assert str(div["a", "a"]) == "<div>aa</div>"
+    assert calls == ["a", "a"]
+
+
+def test_negative_memo_size() -> None:
+    with pytest.raises(ValueError, match="memo_size must not be negative"):
+        htpy.set_escaper(memo_size=-1)
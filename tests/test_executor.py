@@ -0,0 +1,132 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from htpy import Context, Node, div, iter_bytes, iter_node, li, ul
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id")
+
+
+def slow(text: str, delay: float = 0.05) -> Node:
+    def node() -> Node:
+        time.sleep(delay)
+        return li[text]
+
+    return node
+
+
+def test_in_document_order() -> None:
+    node = ul[slow("a", 0.06), slow("b", 0.03), "c", slow("d", 0)]
+    with ThreadPoolExecutor(4) as executor:
+        assert "".join(iter_node(node, executor=executor)) == (
+            "<ul><li>a</li><li>b</li>c<li>d</li></ul>"
+        )
+
+
+def test_concurrent() -> None:
+    node = ul[[slow(str(i), 0.1) for i in range(8)]]
+    with ThreadPoolExecutor(8) as executor:
+        start = time.perf_counter()
+        result = "".join(iter_node(node, executor=executor))
+        assert time.perf_counter() - start < 0.4
+    assert result == "<ul>" + "".join(f"<li>{i}</li>" for i in range(8)) + "</ul>"
+
+
+def test_lookahead() -> None:
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def item() -> str:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return "x"
+
+    with ThreadPoolExecutor(10) as executor:
+        result = "".join(iter_node(div[[item] * 10], executor=executor, lookahead=3))
+    assert result == "<div>" + "x" * 10 + "</div>"
+    assert max_running == 3
+
+
+def test_context() -> None:
+    letter_ctx: Context[str] = Context("letter")
+
+    @letter_ctx.consumer
+    def display_letter(letter: str) -> str:
+        return f"{letter} {request_id.get()} {threading.current_thread().name}"
+
+    def item() -> Node:
+        return display_letter()
+
+    node = letter_ctx.provider("a", lambda: div[item, "b"])
+    request_id.set("req-1")
+    with ThreadPoolExecutor(thread_name_prefix="worker") as executor:
+        result = "".join(iter_node(node, executor=executor))
+    assert result.startswith("<div>a req-1 worker")
+    assert result.endswith("b</div>")
+
+
+def test_lazy_context_value_is_computed_once() -> None:
+    letter_ctx: Context[str] = Context("letter")
+    calls: list[int] = []
+
+    def factory() -> str:
+        calls.append(1)
+        time.sleep(0.02)
+        return "a"
+
+    @letter_ctx.consumer
+    def display_letter(letter: str) -> str:
+        return letter
+
+    node = letter_ctx.lazy_provider(factory, lambda: div[[lambda: display_letter()] * 4])
+    with ThreadPoolExecutor(4) as executor:
+        assert "".join(iter_node(node, executor=executor)) == "<div>aaaa</div>"
+    assert calls == [1]
+
+
+def test_exception() -> None:
+    def fail() -> Node:
+        raise ZeroDivisionError
+
+    with ThreadPoolExecutor() as executor, pytest.raises(ZeroDivisionError):
+        "".join(iter_node(div[fail], executor=executor))
+
+
+def test_close_cancels_pending() -> None:
+    calls: list[int] = []
+
+    def item() -> str:
+        calls.append(1)
+        time.sleep(0.05)
+        return "x"
+
+    with ThreadPoolExecutor(1) as executor:
+        chunks = iter_node(div[[item] * 10], executor=executor, lookahead=5)
+        assert next(chunks) == "<div>"
+        assert next(chunks) == "x"
+        chunks.close()
+    # The first item and the one running when the render was closed.
+    assert len(calls) <= 3
+
+
+def test_iter_bytes() -> None:
+    with ThreadPoolExecutor() as executor:
+        result = b"".join(iter_bytes(ul[slow("å")], executor=executor))
+    assert result == "<ul><li>å</li></ul>".encode()
+
+
+def test_invalid_lookahead() -> None:
+    with (
+        ThreadPoolExecutor() as executor,
+        pytest.raises(ValueError, match="lookahead must be at least 1, got 0"),
+    ):
+        iter_node(div, executor=executor, lookahead=0)
@@ -0,0 +1,60 @@
+import pytest
+
+import htpy
+from htpy import body, div, head, html, iter_bytes, li, title, ul
+
+
+def test_coalesces_chunks() -> None:
+    node = ul[(li[str(i)] for i in range(100))]
+    chunks = list(iter_bytes(node, min_chunk=64))
+
+    assert b"".join(chunks) == str(ul[(li[str(i)] for i in range(100))]).encode()
+    assert all(len(chunk) >= 64 for chunk in chunks[:-1])
+    assert 1 < len(chunks) < 30
+
+
+def test_default_min_chunk() -> None:
+    node = ul[(li[str(i)] for i in range(1000))]
+    chunks = list(iter_bytes(node))
+    assert [len(chunk) >= 8192 for chunk in chunks] == [True] * (len(chunks) - 1) + [False]
+
+
+def test_min_chunk_zero() -> None:
+    assert list(iter_bytes(div["a", "b"], min_chunk=0)) == [b"<div>", b"a", b"b", b"</div>"]
+
+
+def test_negative_min_chunk() -> None:
+    with pytest.raises(ValueError, match="min_chunk must not be negative"):
+        list(iter_bytes(div, min_chunk=-1))
+
+
+def test_flush() -> None:
+    page = html[head[title["hi"]], htpy.flush(), body[div["content"]]]
+    chunks = list(iter_bytes(page))
+    assert chunks == [
+        b"<!doctype html><html><head><title>hi</title></head>",
+        b"<body><div>content</div></body></html>",
+    ]
+
+
+def test_flush_renders_nothing() -> None:
+    assert str(div[htpy.flush(), "a", htpy.flush()]) == "<div>a</div>"
+    assert list(iter_bytes([htpy.flush(), htpy.flush()])) == []
+
+
+def test_encoding() -> None:
+    node = div["åäö"]
+    assert b"".join(iter_bytes(node, "latin-1")) == "<div>åäö</div>".encode("latin-1")
+
+    # The byte order mark is only written once.
+    chunks = list(iter_bytes(div["a", htpy.flush(), "b"], "utf-16"))
+    assert b"".join(chunks).decode("utf-16") == "<div>ab</div>"
+
+
+def test_encoding_errors() -> None:
+    with pytest.raises(UnicodeEncodeError):
+        list(iter_bytes(div["€"], "ascii"))
+
+    assert b"".join(iter_bytes(div["€"], "ascii", errors="xmlcharrefreplace")) == (
+        b"<div>&#8364;</div>"
+    )
@@ -0,0 +1,100 @@
+import datetime
+import json
+from typing import Any
+
+import pytest
+
+from htpy import div, iter_node, json_script, render_node
+
+
+def payload(node: Any) -> str:
+    html = str(node)
+    assert html.startswith("<script")
+    assert html.endswith("</script>")
+    return html[html.index(">") + 1 : -len("</script>")]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        None,
+        "text",
+        1.5,
+        [],
+        {},
+        {"a": [1, 2, {"b": None}], "c": True},
+        list(range(2500)),
+        [{"x": x, "y": [x, x]} for x in range(2500)],
+        {str(x): [[x]] for x in range(1500)},
+        {1: "int key", None: "none key", False: "bool key", 2.5: "float key"},
+        (1, (2, 3)),
+        [[1] * 100, {"big": list(range(100))}],
+    ],
+)
+def test_same_json(data: Any) -> None:
+    assert json.loads(payload(json_script(data))) == json.loads(json.dumps(data))
+
+
+def test_attributes() -> None:
+    assert str(json_script([1], id="chart-data")) == (
+        '<script id="chart-data" type="application/json">[1]</script>'
+    )
+    assert str(json_script([1])) == '<script type="application/json">[1]</script>'
+
+
+def test_escaping() -> None:
+    data = {"html": "</script><script>alert('&')</script>", "<key>": '"quoted"'}
+    result = payload(json_script(data))
+    assert "<" not in result
+    assert ">" not in result
+    assert "&" not in result
+    assert '"quoted' in result
+    assert json.loads(result) == data
+
+
+def test_encoder() -> None:
+    class DateEncoder(json.JSONEncoder):
+        def default(self, o: Any) -> Any:
+            if isinstance(o, datetime.date):
+                return o.isoformat()
+            return super().default(o)
+
+    data = {"dates": [datetime.date(2024, 1, x) for x in range(1, 30)]}
+    assert json.loads(payload(json_script(data, encoder=DateEncoder))) == {
+        "dates": [f"2024-01-{x:02}" for x in range(1, 30)]
+    }
+
+    with pytest.raises(TypeError, match="not JSON serializable"):
+        str(json_script(data))
+
+
+def test_circular_reference() -> None:
+    data: dict[str, Any] = {"items": [1, 2]}
+    data["items"].append(data)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        str(json_script(data))
+
+    items: list[Any] = []
+    items.append(items)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        str(json_script(items))
+
+
+def test_repeated_reference() -> None:
+    shared = {"big": list(range(100))}
+    assert json.loads(payload(json_script([shared, shared]))) == [shared, shared]
+
+
+def test_streamed_in_chunks() -> None:
+    data = [{"x": x, "label": f"point {x}"} for x in range(20000)]
+    chunks = list(iter_node(div[json_script(data, id="d")]))
+    assert chunks[:2] == ["<div>", '<script id="d" type="application/json">']
+    assert len(chunks) > 20
+    assert max(len(chunk) for chunk in chunks) < 64 * 1024
+    assert json.loads("".join(chunks[2:-2])) == data
+
+
+def test_render_node() -> None:
+    assert render_node(div[json_script({"a": 1})]) == (
+        '<div><script type="application/json">{"a":1}</script></div>'
+    )
@@ -1,8 +1,21 @@
+from collections.abc import Iterator
 from typing import Any
 
 from markupsafe import Markup
 
-from htpy import div, iter_node, render_node, tr
+from htpy import (
+    Context,
+    Element,
+    Node,
+    div,
+    html,
+    img,
+    iter_node,
+    li,
+    render_node,
+    tr,
+    ul,
+)
 
 
 def assert_markup(result: Any, expected: str) -> None:
@@ -28,6 +41,19 @@ class Test_render_node:
         result = render_node("hej!")
         assert_markup(result, "hej!")
 
+    def test_same_as_iter_node(self) -> None:
+        def node() -> Node:
+            return html[
+                ul("#list")[(li[x, 1, Markup("<br>")] for x in "a<b")],
+                lambda: img,
+                [["&", None, True], div[div[div["deep"]]]],
+            ]
+
+        assert render_node(node()) == "".join(iter_node(node()))
+
+    def test_encode(self) -> None:
+        assert div["å"].encode() == "<div>å</div>".encode()
+
 
 class Test_iter_node:
     def test_element(self) -> None:
@@ -48,3 +74,141 @@ class Test_iter_node:
     def test_string(self) -> None:
         result = list(iter_node("hej!"))
         assert result == ["hej!"]
+
+    def test_mixed_children_order(self) -> None:
+        ctx: Context[str] = Context("ctx")
+
+        @ctx.consumer
+        def echo(value: str) -> str:
+            return value
+
+        result = list(
+            iter_node(
+                html[
+                    ul[(li[x] for x in "ab")],
+                    lambda: img,
+                    ctx.provider("c", lambda: [echo(), Markup("<br>")]),
+                    1,
+                ]
+            )
+        )
+        assert result == [
+            "<!doctype html>",
+            "<html>",
+            "<ul>",
+            "<li>",
+            "a",
+            "</li>",
+            "<li>",
+            "b",
+            "</li>",
+            "</ul>",
+            "<img>",
+            "c",
+            "<br>",
+            "1",
+            "</html>",
+        ]
+
+    def test_deeply_nested(self) -> None:
+        node: Element = div["x"]
+        for _ in range(5000):
+            node = div[node]
+
+        assert render_node(node) == "<div>" * 5001 + "x" + "</div>" * 5001
+
+    def test_custom_iter_context(self) -> None:
+        class Wrapped(Element):
+            def _iter_context(self, ctx: Any) -> Iterator[str]:
+                yield "<!-- before -->"
+                yield from super()._iter_context(ctx)
+
+        result = list(iter_node(ul[Wrapped("li")["a"]]))
+        assert result == ["<ul>", "<!-- before -->", "<li>", "a", "</li>", "</ul>"]
+
+
+class Test_static_cache:
+    def test_rendered_once_and_reused(self) -> None:
+        footer = div[ul[li["a"], li["b"]], Markup("<hr>"), 1]
+        expected = "<div><ul><li>a</li><li>b</li></ul><hr>1</div>"
+        assert list(iter_node(footer)) == [
+            "<div>",
+            "<ul>",
+            "<li>",
+            "a",
+            "</li>",
+            "<li>",
+            "b",
+            "</li>",
+            "</ul>",
+            "<hr>",
+            "1",
+            "</div>",
+        ]
+        # Cached the second time it is rendered and then emitted as one chunk.
+        assert str(footer) == expected
+        assert list(iter_node(ul[footer])) == ["<ul>", expected, "</ul>"]
+        assert str(footer) == expected
+
+    def test_cached_when_streaming(self) -> None:
+        menu = ul[li["a"], li["b"]]
+        list(iter_node(menu))
+        assert list(iter_node(div[menu])) == ["<div>", "<ul><li>a</li><li>b</li></ul>", "</div>"]
+        assert list(iter_node(div[menu])) == ["<div>", "<ul><li>a</li><li>b</li></ul>", "</div>"]
+
+    def test_html_element(self) -> None:
+        page = html[div["a"]]
+        for _ in range(3):
+            assert str(page) == "<!doctype html><html><div>a</div></html>"
+
+    def test_list_children_are_not_cached(self) -> None:
+        items = [li["a"]]
+        menu = ul[items]
+        assert str(menu) == "<ul><li>a</li></ul>"
+        assert str(menu) == "<ul><li>a</li></ul>"
+        items.append(li["b"])
+        assert str(menu) == "<ul><li>a</li><li>b</li></ul>"
+
+    def test_callable_children_are_not_cached(self) -> None:
+        calls: list[int] = []
+
+        def child() -> Node:
+            calls.append(1)
+            return len(calls)
+
+        node = div[li["x"], child]
+        assert [str(node) for _ in range(3)] == [
+            "<div><li>x</li>1</div>",
+            "<div><li>x</li>2</div>",
+            "<div><li>x</li>3</div>",
+        ]
+
+    def test_custom_iter_context_is_not_cached(self) -> None:
+        calls: list[int] = []
+
+        class Counter(Element):
+            def _iter_context(self, ctx: Any) -> Iterator[str]:
+                calls.append(1)
+                yield str(len(calls))
+
+        node = div[ul[Counter("li")]]
+        assert [str(node) for _ in range(3)] == [
+            "<div><ul>1</ul></div>",
+            "<div><ul>2</ul></div>",
+            "<div><ul>3</ul></div>",
+        ]
+
+    def test_nested_static_element(self) -> None:
+        item = li["a", "b"]
+        menu = ul[item, li["c"]]
+        for _ in range(3):
+            assert str(menu) == "<ul><li>ab</li><li>c</li></ul>"
+            assert str(div[item]) == "<div><li>ab</li></div>"
+
+    def test_deeply_nested(self) -> None:
+        node: Element = div["x"]
+        for _ in range(5000):
+            node = div[node]
+
+        for _ in range(3):
+            assert render_node(node) == "<div>" * 5001 + "x" + "</div>" * 5001
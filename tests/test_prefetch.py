@@ -0,0 +1,105 @@
+import contextvars
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from htpy import Node, iter_node, li, prefetch, render_node, ul
+
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id")
+
+
+def slow_rows(count: int, delay: float) -> Iterator[int]:
+    for row in range(count):
+        time.sleep(delay)
+        yield row
+
+
+def slow_row(row: int, delay: float) -> Node:
+    def render() -> Node:
+        time.sleep(delay)
+        return li[row]
+
+    return render
+
+
+def render_rows(rows: Iterator[int]) -> str:
+    return render_node(ul[(slow_row(row, 0.01) for row in rows)])
+
+
+def test_renders_in_order() -> None:
+    assert render_node(ul[(li[x] for x in prefetch(range(100), buffer=3))]) == (
+        "<ul>" + "".join(f"<li>{x}</li>" for x in range(100)) + "</ul>"
+    )
+
+
+def test_fetching_and_rendering_overlap() -> None:
+    start = time.perf_counter()
+    expected = render_rows(slow_rows(20, 0.01))
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert render_rows(prefetch(slow_rows(20, 0.01), buffer=4)) == expected
+    prefetched = time.perf_counter() - start
+
+    # Fetching and rendering take 0.2s each: about 0.4s in turn and a bit over
+    # 0.2s when they overlap.
+    assert sequential > 0.4
+    assert prefetched < 0.32
+
+
+def test_buffer_limits_fetched_items() -> None:
+    fetched: list[int] = []
+
+    def rows() -> Iterator[int]:
+        for row in range(100):
+            fetched.append(row)
+            yield row
+
+    items = prefetch(rows(), buffer=5)
+    assert next(items) == 0
+    time.sleep(0.05)
+    # The buffer, the item being put and the one that was taken.
+    assert len(fetched) <= 7
+
+
+def test_close_stops_the_producer() -> None:
+    closed = threading.Event()
+
+    def rows() -> Iterator[int]:
+        try:
+            yield from range(100)
+        finally:
+            closed.set()
+
+    chunks = iter_node(ul[prefetch(rows(), buffer=2)])
+    assert next(chunks) == "<ul>"
+    assert next(chunks) == "0"
+    chunks.close()
+    assert closed.wait(1)
+
+
+def test_exception() -> None:
+    def rows() -> Iterator[int]:
+        yield 1
+        raise ZeroDivisionError
+
+    chunks = iter_node(ul[prefetch(rows())])
+    assert next(chunks) == "<ul>"
+    assert next(chunks) == "1"
+    with pytest.raises(ZeroDivisionError):
+        next(chunks)
+
+
+def test_contextvars() -> None:
+    def rows() -> Iterator[str]:
+        yield request_id.get()
+
+    request_id.set("req-1")
+    assert render_node(ul[prefetch(rows())]) == "<ul>req-1</ul>"
+
+
+def test_invalid_buffer() -> None:
+    with pytest.raises(ValueError, match="buffer must be at least 1, got 0"):
+        prefetch([], buffer=0)
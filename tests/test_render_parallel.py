@@ -0,0 +1,52 @@
+import pytest
+
+from htpy import Node, render_node, render_parallel, table, tbody, td, tr
+
+
+def row_component(row: int) -> Node:
+    return tr[td[row], td["<&>"]]
+
+
+def failing_row(row: int) -> Node:
+    if row == 42:
+        raise ZeroDivisionError
+    return tr[td[row]]
+
+
+def test_same_as_sequential() -> None:
+    rows = range(2345)
+    assert render_node(
+        table[tbody[render_parallel(rows, row_component, processes=2, shard_size=100)]]
+    ) == render_node(table[tbody[(row_component(row) for row in rows)]])
+
+
+def test_shard_larger_than_rows() -> None:
+    assert render_node(render_parallel(iter([1, 2]), row_component, processes=3)) == (
+        "<tr><td>1</td><td>&lt;&amp;&gt;</td></tr><tr><td>2</td><td>&lt;&amp;&gt;</td></tr>"
+    )
+
+
+def test_no_rows() -> None:
+    assert render_node(table[render_parallel([], row_component, processes=2)]) == "<table></table>"
+
+
+def test_exception() -> None:
+    with pytest.raises(ZeroDivisionError):
+        render_node(render_parallel(range(100), failing_row, processes=2, shard_size=10))
+
+
+def test_component_must_be_importable() -> None:
+    with pytest.raises(TypeError, match="can be imported by reference"):
+        render_parallel(range(10), lambda row: tr[td[row]])
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "message"),
+    [
+        ({"processes": 0}, "processes must be at least 1, got 0"),
+        ({"shard_size": 0}, "shard_size must be at least 1, got 0"),
+    ],
+)
+def test_invalid_arguments(kwargs: dict[str, int], message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        render_parallel(range(10), row_component, **kwargs)
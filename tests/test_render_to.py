@@ -0,0 +1,116 @@
+import io
+import os
+import typing as t
+from pathlib import Path
+
+import pytest
+
+import htpy
+from htpy import body, div, head, html, li, render_to, title, ul
+
+
+def big_list() -> htpy.Element:
+    return ul[(li[f"item {i} åäö"] for i in range(5000))]
+
+
+EXPECTED = str(big_list())
+
+
+def test_write_callable() -> None:
+    written: list[str] = []
+    render_to(big_list(), written.append, buffer_size=1000)
+
+    assert "".join(written) == EXPECTED
+    assert all(len(text) >= 1000 for text in written[:-1])
+    assert max(len(text) for text in written) < 1100
+
+
+def test_text_file(tmp_path: Path) -> None:
+    path = tmp_path / "page.html"
+    with path.open("w", encoding="utf-8") as f:
+        render_to(big_list(), f)
+
+    assert path.read_text(encoding="utf-8") == EXPECTED
+
+
+def test_string_io() -> None:
+    f = io.StringIO()
+    render_to(big_list(), f)
+    assert f.getvalue() == EXPECTED
+
+
+def test_binary_file(tmp_path: Path) -> None:
+    path = tmp_path / "page.html"
+    with path.open("wb") as f:
+        render_to(big_list(), f, encoding="utf-16")
+
+    assert path.read_bytes().decode("utf-16") == EXPECTED
+
+
+def test_bytes_io() -> None:
+    f = io.BytesIO()
+    render_to(big_list(), f)
+    assert f.getvalue() == EXPECTED.encode()
+
+
+def test_file_descriptor(tmp_path: Path) -> None:
+    path = tmp_path / "page.html"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        render_to(big_list(), fd, buffer_size=10_000)
+    finally:
+        os.close(fd)
+
+    assert path.read_text(encoding="utf-8") == EXPECTED
+
+
+def test_file_descriptor_partial_writes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    writev = os.writev
+    calls: list[int] = []
+
+    def partial_writev(fd: int, buffers: t.Sequence[t.Any]) -> int:
+        # Write at most 1000 bytes, usually in the middle of a buffer.
+        remaining = 1000
+        limited: list[t.Any] = []
+        for buffer in buffers:
+            limited.append(buffer[:remaining])
+            remaining -= len(limited[-1])
+            if not remaining:
+                break
+        calls.append(len(limited))
+        return writev(fd, limited)
+
+    monkeypatch.setattr(os, "writev", partial_writev)
+
+    path = tmp_path / "page.html"
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    try:
+        render_to(big_list(), fd)
+    finally:
+        os.close(fd)
+
+    assert path.read_text(encoding="utf-8") == EXPECTED
+    assert max(calls) > 1
+
+
+def test_flush(tmp_path: Path) -> None:
+    class File(io.StringIO):
+        def __init__(self) -> None:
+            super().__init__()
+            self.flushed_at: list[int] = []
+
+        def flush(self) -> None:
+            self.flushed_at.append(self.tell())
+            super().flush()
+
+    f = File()
+    render_to(html[head[title["hi"]], htpy.flush(), body[div["content"]]], f)
+
+    head_html = "<!doctype html><html><head><title>hi</title></head>"
+    assert f.getvalue() == head_html + "<body><div>content</div></body></html>"
+    assert f.flushed_at == [len(head_html)]
+
+
+def test_buffer_size() -> None:
+    with pytest.raises(ValueError, match="buffer_size must be positive"):
+        render_to(div, print, buffer_size=0)
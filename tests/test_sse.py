@@ -0,0 +1,97 @@
+import asyncio
+import queue
+
+import pytest
+from markupsafe import Markup
+
+from htpy import Node, div, flush, pre, td, tr
+from htpy.sse import Broadcast, format_event, iter_event
+
+
+def test_format_event() -> None:
+    assert format_event(tr[td["<1>"]]) == "data: <tr><td>&lt;1&gt;</td></tr>\n\n"
+
+
+def test_fields() -> None:
+    assert format_event(div, event="update", id="42", retry=1000) == (
+        "event: update\nid: 42\nretry: 1000\ndata: <div></div>\n\n"
+    )
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n", "\r"])
+def test_multiple_lines(newline: str) -> None:
+    node = pre[Markup(f"a{newline}b{newline}")]
+    assert format_event(node) == "data: <pre>a\ndata: b\ndata: </pre>\n\n"
+    assert "".join(iter_event(node)) == format_event(node)
+
+
+def test_iter_event() -> None:
+    node = div(".row")[[div[x] for x in "ab"]]
+    chunks = list(iter_event(node, event="rows"))
+    assert chunks[0] == "event: rows\ndata: "
+    assert chunks[-1] == "\n\n"
+    assert "".join(chunks) == format_event(node, event="rows")
+
+
+def test_iter_event_chunks_are_str() -> None:
+    chunks = list(iter_event(div[Markup("<b>x</b>"), flush()]))
+    assert all(type(chunk) is str for chunk in chunks)
+
+
+def test_iter_event_split_crlf() -> None:
+    node = pre[Markup("a\r"), Markup("\nb")]
+    assert "".join(iter_event(node)) == "data: <pre>a\ndata: b</pre>\n\n"
+
+
+@pytest.mark.parametrize("value", ["a\nb", "a\rb", "a\0b"])
+def test_invalid_fields(value: str) -> None:
+    with pytest.raises(ValueError, match="event must not contain line breaks or NUL"):
+        format_event(div, event=value)
+    with pytest.raises(ValueError, match="id must not contain line breaks or NUL"):
+        format_event(div, id=value)
+
+
+class Test_Broadcast:
+    def test_rendered_once(self) -> None:
+        renders: list[int] = []
+
+        def row() -> Node:
+            renders.append(1)
+            return tr[td["1"]]
+
+        broadcast = Broadcast()
+        subscribers: list[queue.SimpleQueue[bytes]] = [queue.SimpleQueue() for _ in range(100)]
+        for subscriber in subscribers:
+            broadcast.subscribe(subscriber)
+
+        assert broadcast.publish(row, event="row") == 100
+        assert len(renders) == 1
+        frames = [subscriber.get_nowait() for subscriber in subscribers]
+        assert frames[0] == b"event: row\ndata: <tr><td>1</td></tr>\n\n"
+        assert all(frame is frames[0] for frame in frames)
+
+    def test_unsubscribe(self) -> None:
+        broadcast = Broadcast()
+        subscriber: queue.SimpleQueue[bytes] = queue.SimpleQueue()
+        broadcast.subscribe(subscriber)
+        assert len(broadcast) == 1
+        broadcast.unsubscribe(subscriber)
+        broadcast.unsubscribe(subscriber)
+        assert len(broadcast) == 0
+        assert broadcast.publish(div) == 0
+        assert subscriber.empty()
+
+    def test_full_queue(self) -> None:
+        async def main() -> None:
+            broadcast = Broadcast()
+            slow: asyncio.Queue[bytes] = asyncio.Queue(maxsize=1)
+            fast: asyncio.Queue[bytes] = asyncio.Queue()
+            broadcast.subscribe(slow)
+            broadcast.subscribe(fast)
+            assert broadcast.publish("1") == 2
+            assert broadcast.publish("2") == 1
+            assert slow.qsize() == 1
+            assert fast.qsize() == 2
+            assert len(broadcast) == 2
+
+        asyncio.run(main())
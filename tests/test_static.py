@@ -0,0 +1,51 @@
+import typing as t
+
+import pytest
+from markupsafe import Markup
+
+import htpy
+from htpy import Context, a, div, footer, iter_node, li, nav, ul
+
+
+def test_static() -> None:
+    result = htpy.static(nav[ul[li[a(href="/")["Home"]], li["<About>"], [1, None, False]]])
+    assert isinstance(result, Markup)
+    assert result == '<nav><ul><li><a href="/">Home</a></li><li>&lt;About&gt;</li>1</ul></nav>'
+
+
+def test_static_is_one_chunk() -> None:
+    menu = htpy.static(ul[li["a"], li["b"]])
+    assert list(iter_node(div[menu])) == ["<div>", "<ul><li>a</li><li>b</li></ul>", "</div>"]
+
+
+@pytest.mark.parametrize(
+    ("node", "message"),
+    [
+        (footer[lambda: "now"], "callables may return something else on every render"),
+        (ul[(li[x] for x in "ab")], "iterators can only be rendered once"),
+        (ul[[li["a"], iter([li["b"]])]], "iterators can only be rendered once"),
+    ],
+)
+def test_refuses_dynamic_nodes(node: htpy.Node, message: str) -> None:
+    with pytest.raises(ValueError, match=message):
+        htpy.static(node)
+
+
+def test_refuses_context() -> None:
+    ctx: Context[str] = Context("ctx", default="")
+
+    @ctx.consumer
+    def display(value: str) -> str:
+        return value
+
+    with pytest.raises(ValueError, match="it depends on the render context"):
+        htpy.static(div[display()])
+
+    with pytest.raises(ValueError, match="it depends on the render context"):
+        htpy.static(ctx.provider("value", lambda: div))
+
+
+def test_refuses_invalid_child() -> None:
+    values: list[t.Any] = [1.5]
+    with pytest.raises(ValueError, match="1.5 is not a valid child element"):
+        htpy.static(values)
@@ -0,0 +1,84 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from htpy import iter_node, pre, render_node, text_file
+
+TEXT = "line <1> & 'quoted'\nåäö € 𝄞 " * 50
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> Path:
+    path = tmp_path / "log.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    return path
+
+
+def escaped(text: str) -> str:
+    return str(render_node(text))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 65536])
+def test_path(path: Path, chunk_size: int) -> None:
+    assert str(pre[text_file(path, chunk_size)]) == f"<pre>{escaped(TEXT)}</pre>"
+    assert str(pre[text_file(str(path), chunk_size)]) == f"<pre>{escaped(TEXT)}</pre>"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 100])
+def test_binary_file(chunk_size: int) -> None:
+    file = io.BytesIO(TEXT.encode())
+    assert render_node(text_file(file, chunk_size)) == escaped(TEXT)
+    assert not file.closed
+
+
+def test_text_file_object() -> None:
+    assert render_node(text_file(io.StringIO(TEXT), 10)) == escaped(TEXT)
+
+
+def test_encoding() -> None:
+    file = io.BytesIO("åäö".encode("latin-1"))
+    assert render_node(text_file(file, 2, encoding="latin-1")) == "åäö"
+
+
+def test_errors() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        render_node(text_file(io.BytesIO(b"ok \xff"), 2))
+    assert render_node(text_file(io.BytesIO(b"ok \xff"), 2, errors="replace")) == "ok �"
+
+
+def test_truncated_character() -> None:
+    with pytest.raises(UnicodeDecodeError):
+        render_node(text_file(io.BytesIO("€".encode()[:2])))
+
+
+def test_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert render_node(pre[text_file(path)]) == "<pre></pre>"
+
+
+def test_pipe() -> None:
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b"<pipe>")
+    os.close(write_fd)
+    with open(read_fd, "rb") as file:
+        assert render_node(text_file(file)) == "&lt;pipe&gt;"
+
+
+def test_streamed_in_chunks(path: Path) -> None:
+    chunks = list(iter_node(text_file(path, 100)))
+    assert len(chunks) > 10
+    assert "".join(chunks) == escaped(TEXT)
+
+
+def test_missing_file(tmp_path: Path) -> None:
+    node = text_file(tmp_path / "missing.txt")
+    with pytest.raises(FileNotFoundError):
+        render_node(node)
+
+
+def test_invalid_chunk_size() -> None:
+    with pytest.raises(ValueError, match="chunk_size must be at least 1, got 0"):
+        text_file("log.txt", 0)